@@ -149,4 +149,18 @@ ENCRYPTION_KEY = env('ENCRYPTION_KEY', default=None)
 # Number of days to wait for API data to be stable.
 # This delay accounts for the time it takes for Apple/Google to process and
 # finalize the data for a given day. The default of 2 is a safe value.
-DATA_FETCH_DELAY_DAYS = env.int('DATA_FETCH_DELAY_DAYS', default=2)
\ No newline at end of file
+DATA_FETCH_DELAY_DAYS = env.int('DATA_FETCH_DELAY_DAYS', default=2)
+
+# Number of apps processed concurrently by run_daily_task.
+# Work per app is dominated by network I/O (store APIs and Lark webhooks).
+DAILY_TASK_CONCURRENCY = env.int('DAILY_TASK_CONCURRENCY', default=4)
+
+# Per-platform worker pools for run_daily_task; iOS and Android APIs have separate rate limits.
+DAILY_TASK_IOS_WORKERS = env.int('DAILY_TASK_IOS_WORKERS', default=DAILY_TASK_CONCURRENCY)
+DAILY_TASK_ANDROID_WORKERS = env.int('DAILY_TASK_ANDROID_WORKERS', default=DAILY_TASK_CONCURRENCY)
+
+# Alert logs older than this many days are removed by `manage.py cleanup_alert_logs`.
+ALERT_LOG_RETENTION_DAYS = env.int('ALERT_LOG_RETENTION_DAYS', default=90)
+
+# PID file written by the task scheduler so other processes can check whether it is running.
+SCHEDULER_PID_FILE = env('SCHEDULER_PID_FILE', default='/tmp/app_data_monitor_scheduler.pid')
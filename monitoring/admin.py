@@ -1,15 +1,79 @@
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import (
+    BooleanField, Case, CharField, ExpressionWrapper, F, Prefetch, Q, Value, When, Window
+)
+from django.db.models.functions import Greatest, RowNumber
 from django.urls import reverse, path
+from django.utils.functional import cached_property
 from django.utils.html import format_html
 from django.utils.safestring import mark_safe
-from django.utils.text import slugify
 from django.http import HttpResponse, Http404
 from .models import (
     App, Credential, AlertRule, DailyReportConfig, 
     DataRecord, AlertLog, TaskSchedule, TaskExecution
 )
 from .forms import CredentialAdminForm
-import json
+from functools import reduce
+import operator
+import orjson
+
+
+# 下载来源 (显示名称, 字段名)
+_SOURCE_FIELDS = (
+    ('App Store搜索', 'downloads_app_store_search'),
+    ('网页推荐', 'downloads_web_referrer'),
+    ('应用推荐', 'downloads_app_referrer'),
+    ('App Store浏览', 'downloads_app_store_browse'),
+    ('机构采购', 'downloads_institutional'),
+    ('其他', 'downloads_other'),
+)
+
+_WEEKDAYS = ('周一', '周二', '周三', '周四', '周五', '周六', '周日')
+
+# 按执行频率格式化调度时间
+_SCHEDULE_TIME_FORMATTERS = {
+    'daily': lambda obj, time_str: f"每日 {time_str}",
+    'weekly': lambda obj, time_str: f"{_WEEKDAYS[obj.weekday or 0]} {time_str}",
+    'monthly': lambda obj, time_str: f"每月{obj.day_of_month or 1}日 {time_str}",
+}
+
+# 执行状态对应的显示颜色
+_STATUS_COLORS = {
+    'success': 'green',
+    'failed': 'red',
+    'running': 'orange',
+    'pending': 'blue',
+}
+
+# 详情页内联显示原始数据的最大字节数
+RAW_DATA_DISPLAY_LIMIT = 64 * 1024
+
+_DISABLED_HTML = mark_safe('<span style="color: gray;">已禁用</span>')
+_RUNNING_HTML = mark_safe('<span style="color: orange;">🔄 执行中...</span>')
+
+
+class EstimatedCountPaginator(Paginator):
+    """大表分页器：未筛选时使用 PostgreSQL 统计信息估算总数，避免全表 COUNT(*)"""
+    
+    # 低于此行数时估算值意义不大，仍使用精确计数
+    estimate_threshold = 10000
+    
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if not queryset.query.where and connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples FROM pg_class WHERE relname = %s",
+                    [queryset.model._meta.db_table]
+                )
+                row = cursor.fetchone()
+            if row and row[0] >= self.estimate_threshold:
+                return int(row[0])
+        return super().count
 
 
 @admin.register(App)
@@ -91,6 +155,7 @@ class AlertRuleAdmin(admin.ModelAdmin):
     ]
     search_fields = ['app__name', 'metric']
     list_editable = ['is_active']
+    list_select_related = ['app']
     
     fieldsets = (
         ('基本设置', {
@@ -117,11 +182,17 @@ class AlertRuleAdmin(admin.ModelAdmin):
     
     threshold_range.short_description = '阈值范围'
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            _has_webhook=ExpressionWrapper(~Q(lark_webhook_alert=''), output_field=BooleanField())
+        )
+    
     def has_webhook(self, obj):
-        return bool(obj.lark_webhook_alert)
+        return obj._has_webhook
     
     has_webhook.short_description = '告警Webhook'
     has_webhook.boolean = True
+    has_webhook.admin_order_field = '_has_webhook'
 
 
 @admin.register(DailyReportConfig)
@@ -132,6 +203,7 @@ class DailyReportConfigAdmin(admin.ModelAdmin):
     list_filter = ['is_active', 'app__platform', 'created_at']
     search_fields = ['app__name']
     list_editable = ['is_active']
+    list_select_related = ['app']
     
     fieldsets = (
         ('基本设置', {
@@ -147,17 +219,25 @@ class DailyReportConfigAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            _has_webhook=ExpressionWrapper(~Q(lark_webhook_daily=''), output_field=BooleanField()),
+            _has_sheet=ExpressionWrapper(~Q(lark_sheet_id=''), output_field=BooleanField()),
+        )
+    
     def has_webhook(self, obj):
-        return bool(obj.lark_webhook_daily)
+        return obj._has_webhook
     
     has_webhook.short_description = '日报Webhook'
     has_webhook.boolean = True
+    has_webhook.admin_order_field = '_has_webhook'
     
     def has_sheet(self, obj):
-        return bool(obj.lark_sheet_id)
+        return obj._has_sheet
     
     has_sheet.short_description = 'Lark表格'
     has_sheet.boolean = True
+    has_sheet.admin_order_field = '_has_sheet'
 
 
 @admin.register(DataRecord)
@@ -172,6 +252,10 @@ class DataRecordAdmin(admin.ModelAdmin):
     search_fields = ['app__name']
     date_hierarchy = 'date'
     ordering = ['-date', 'app']
+    list_select_related = ['app']
+    list_per_page = 50
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
     fieldsets = (
         ('基本信息', {
@@ -197,23 +281,25 @@ class DataRecordAdmin(admin.ModelAdmin):
     
     readonly_fields = ['export_raw_json_button', 'formatted_raw_data', 'created_at']
     
+    def get_queryset(self, request):
+        # 列表页不展示原始数据，延迟加载 raw_data 以减少传输量；
+        # 主要来源及其占比直接由数据库计算
+        source_values = [F(attr) for _, attr in _SOURCE_FIELDS]
+        top_value = Greatest(*source_values)
+        return super().get_queryset(request).select_related('app').defer('raw_data').annotate(
+            _source_total=reduce(operator.add, source_values),
+            _top_source_value=top_value,
+            _top_source_label=Case(
+                *(When(**{attr: top_value}, then=Value(label)) for label, attr in _SOURCE_FIELDS),
+                output_field=CharField()
+            ),
+        )
+    
     def top_source_type(self, obj):
         """显示主要下载来源"""
-        source_types = {
-            'App Store搜索': obj.downloads_app_store_search,
-            '网页推荐': obj.downloads_web_referrer,
-            '应用推荐': obj.downloads_app_referrer,
-            'App Store浏览': obj.downloads_app_store_browse,
-            '机构采购': obj.downloads_institutional,
-            '其他': obj.downloads_other,
-        }
-        
-        # 找到最大值的来源
-        max_source = max(source_types.items(), key=lambda x: x[1])
-        if max_source[1] > 0:
-            total = sum(source_types.values())
-            percentage = (max_source[1] / total * 100) if total > 0 else 0
-            return f"{max_source[0]} ({percentage:.1f}%)"
+        if obj._top_source_value > 0:
+            percentage = obj._top_source_value / obj._source_total * 100
+            return f"{obj._top_source_label} ({percentage:.1f}%)"
         return "无数据"
     
     top_source_type.short_description = '主要来源'
@@ -221,12 +307,18 @@ class DataRecordAdmin(admin.ModelAdmin):
     def formatted_raw_data(self, obj):
         """格式化显示原始数据"""
         if obj.raw_data:
-            formatted_json = json.dumps(
-                obj.raw_data, 
-                indent=2, 
-                ensure_ascii=False
+            # 先用紧凑编码估算大小，数据过大时不再生成带缩进的文本，引导使用导出功能
+            compact_size = len(orjson.dumps(obj.raw_data, option=orjson.OPT_NON_STR_KEYS))
+            if compact_size > RAW_DATA_DISPLAY_LIMIT:
+                return format_html(
+                    '<p>数据过大（{} bytes），请使用"导出 JSON"按钮下载</p>',
+                    compact_size
+                )
+            formatted_json = orjson.dumps(
+                obj.raw_data,
+                option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
             )
-            return format_html('<pre>{}</pre>', formatted_json)
+            return format_html('<pre>{}</pre>', formatted_json.decode())
         return "无数据"
     
     formatted_raw_data.short_description = '原始数据'
@@ -260,10 +352,12 @@ class DataRecordAdmin(admin.ModelAdmin):
             raise Http404("记录不存在")
 
         data = obj.raw_data or {}
-        content = json.dumps(data, indent=2, ensure_ascii=False)
+        # orjson 直接输出UTF-8字节，无需再次编码
+        content = orjson.dumps(
+            data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+        )
 
-        app_slug = slugify(obj.app.name)
-        filename = f"datarecord_{app_slug}_{obj.date}.json"
+        filename = f"datarecord_{obj.app.slug}_{obj.date}.json"
 
         response = HttpResponse(content, content_type='application/json; charset=utf-8')
         response['Content-Disposition'] = f'attachment; filename="{filename}"'
@@ -283,6 +377,10 @@ class AlertLogAdmin(admin.ModelAdmin):
     search_fields = ['app__name', 'message', 'metric']
     date_hierarchy = 'created_at'
     ordering = ['-created_at']
+    list_select_related = ['app']
+    list_per_page = 50
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
     fieldsets = (
         ('告警信息', {
@@ -324,6 +422,7 @@ class TaskScheduleAdmin(admin.ModelAdmin):
     ]
     search_fields = ['name', 'app__name']
     list_editable = ['is_active']
+    list_select_related = ['app']
     
     fieldsets = (
         ('基本设置', {
@@ -344,36 +443,34 @@ class TaskScheduleAdmin(admin.ModelAdmin):
     def schedule_time(self, obj):
         """显示调度时间"""
         time_str = f"{obj.hour:02d}:{obj.minute:02d}"
-        if obj.frequency == 'daily':
-            return f"每日 {time_str}"
-        elif obj.frequency == 'weekly':
-            weekdays = ['周一', '周二', '周三', '周四', '周五', '周六', '周日']
-            weekday_name = weekdays[obj.weekday] if obj.weekday is not None else '周一'
-            return f"{weekday_name} {time_str}"
-        elif obj.frequency == 'monthly':
-            day = obj.day_of_month if obj.day_of_month else 1
-            return f"每月{day}日 {time_str}"
-        return time_str
+        formatter = _SCHEDULE_TIME_FORMATTERS.get(obj.frequency)
+        return formatter(obj, time_str) if formatter else time_str
     
     schedule_time.short_description = '执行时间'
     
+    def get_queryset(self, request):
+        # 用窗口函数一次性预取每个调度最新的一条执行记录，避免 last_execution 逐行查询
+        latest_per_schedule = TaskExecution.objects.only(
+            'id', 'schedule_id', 'status', 'created_at'
+        ).annotate(
+            _row_number=Window(
+                expression=RowNumber(),
+                partition_by=[F('schedule_id')],
+                order_by=F('created_at').desc()
+            )
+        ).filter(_row_number=1)
+        return super().get_queryset(request).prefetch_related(
+            Prefetch('taskexecution_set', queryset=latest_per_schedule, to_attr='_latest_execs')
+        )
+    
     def last_execution(self, obj):
         """显示最后执行时间"""
-        last_exec = TaskExecution.objects.filter(
-            schedule=obj
-        ).order_by('-created_at').first()
+        last_exec = obj._latest_execs[0] if obj._latest_execs else None
         
         if last_exec:
-            status_color = {
-                'success': 'green',
-                'failed': 'red',
-                'running': 'orange',
-                'pending': 'blue'
-            }.get(last_exec.status, 'black')
-            
             return format_html(
                 '<span style="color: {};">{} ({})</span>',
-                status_color,
+                _STATUS_COLORS.get(last_exec.status, 'black'),
                 last_exec.created_at.strftime('%Y-%m-%d %H:%M'),
                 last_exec.get_status_display()
             )
@@ -384,7 +481,7 @@ class TaskScheduleAdmin(admin.ModelAdmin):
     def next_execution_info(self, obj):
         """显示下次执行信息"""
         if not obj.is_active:
-            return format_html('<span style="color: gray;">已禁用</span>')
+            return _DISABLED_HTML
         
         cron_expr = obj.get_cron_expression()
         return format_html(
@@ -399,12 +496,11 @@ class TaskScheduleAdmin(admin.ModelAdmin):
         """立即执行选中的任务"""
         from .utils.task_executor import TaskExecutor
         
+        executor = TaskExecutor()
         executed_count = 0
-        for schedule in queryset:
-            if schedule.is_active:
-                executor = TaskExecutor()
-                executor.execute_schedule_manual(schedule)
-                executed_count += 1
+        for schedule in queryset.filter(is_active=True).select_related('app'):
+            executor.execute_schedule_manual(schedule)
+            executed_count += 1
         
         self.message_user(
             request,
@@ -447,6 +543,10 @@ class TaskExecutionAdmin(admin.ModelAdmin):
     search_fields = ['schedule__name', 'app__name']
     date_hierarchy = 'created_at'
     ordering = ['-created_at']
+    list_select_related = ['schedule', 'app']
+    list_per_page = 50
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
     fieldsets = (
         ('执行信息', {
@@ -471,6 +571,12 @@ class TaskExecutionAdmin(admin.ModelAdmin):
     
     actions = ['retry_failed_executions', 'clear_old_logs']
     
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        # 调度下拉框的选项文本（TaskSchedule.__str__）包含App名称，一并取出避免逐项查询
+        if db_field.name == 'schedule':
+            kwargs['queryset'] = TaskSchedule.objects.select_related('app')
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+    
     def schedule_name(self, obj):
         """显示调度名称"""
         return obj.schedule.name if obj.schedule else "手动任务"
@@ -502,18 +608,18 @@ class TaskExecutionAdmin(admin.ModelAdmin):
     
     def stats_summary(self, obj):
         """显示统计摘要"""
+        # 插值均为整数，int() 保证输出无需转义
         if obj.status == 'success':
-            return format_html(
-                '✅ 成功:{} | ⚠️ 告警:{} | 📢 通知:{}',
-                obj.success_count, obj.alerts_generated, obj.notifications_sent
+            return mark_safe(
+                f'✅ 成功:{int(obj.success_count)} | ⚠️ 告警:{int(obj.alerts_generated)} | '
+                f'📢 通知:{int(obj.notifications_sent)}'
             )
         elif obj.status == 'failed':
-            return format_html(
-                '❌ 失败:{} | ✅ 成功:{}',
-                obj.error_count, obj.success_count
+            return mark_safe(
+                f'❌ 失败:{int(obj.error_count)} | ✅ 成功:{int(obj.success_count)}'
             )
         elif obj.status == 'running':
-            return format_html('<span style="color: orange;">🔄 执行中...</span>')
+            return _RUNNING_HTML
         else:
             return obj.get_status_display()
     
@@ -523,12 +629,13 @@ class TaskExecutionAdmin(admin.ModelAdmin):
         """重试失败的执行"""
         from .utils.task_executor import TaskExecutor
         
+        retryable = queryset.retryable()
+        
+        executor = TaskExecutor()
         retried_count = 0
-        for execution in queryset:
-            if execution.can_retry():
-                executor = TaskExecutor()
-                executor.retry_execution(execution)
-                retried_count += 1
+        for execution in retryable:
+            executor.retry_execution(execution)
+            retried_count += 1
         
         self.message_user(
             request,
@@ -543,10 +650,8 @@ class TaskExecutionAdmin(admin.ModelAdmin):
         from django.utils import timezone
         
         cutoff_date = timezone.now() - timedelta(days=30)
-        old_executions = queryset.filter(created_at__lt=cutoff_date)
-        
-        count = old_executions.count()
-        old_executions.delete()
+        # TaskExecution 没有关联对象和删除信号，delete() 会直接执行单条 DELETE
+        count, _ = queryset.filter(created_at__lt=cutoff_date).delete()
         
         self.message_user(
             request,
@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from django.utils import timezone
+from datetime import timedelta
+from ...models import AlertLog
+
+
+class Command(BaseCommand):
+    help = '清理超过保留期限的告警日志'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.ALERT_LOG_RETENTION_DAYS,
+            help=f'保留最近多少天的告警日志 (默认{settings.ALERT_LOG_RETENTION_DAYS}天)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='每批删除的记录数，避免单条 DELETE 长时间锁表 (默认5000)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='只统计待清理的记录数，不实际删除'
+        )
+
+    def handle(self, *args, **options):
+        days = options['days']
+        batch_size = options['batch_size']
+        if days < 0:
+            raise CommandError('--days 不能为负数')
+        if batch_size < 1:
+            raise CommandError('--batch-size 必须大于等于 1')
+        cutoff = timezone.now() - timedelta(days=days)
+
+        # 按 created_at 索引筛选；告警日志没有关联对象和删除信号，按主键分批直接 DELETE
+        old_logs = AlertLog.objects.filter(created_at__lt=cutoff).order_by()
+
+        if options['dry_run']:
+            count = old_logs.count()
+            self.stdout.write(f'🔄 试运行模式 - {days}天前的告警日志共 {count} 条，不会删除')
+            return
+
+        total_deleted = 0
+        while True:
+            ids = list(old_logs.values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            deleted, _ = AlertLog.objects.filter(id__in=ids).delete()
+            total_deleted += deleted
+
+        self.stdout.write(
+            self.style.SUCCESS(f'✅ 已清理 {total_deleted} 条{days}天前的告警日志')
+        )
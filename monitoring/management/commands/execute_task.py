@@ -1,9 +1,11 @@
 from django.core.management.base import BaseCommand
+from django.db.models import OuterRef, Subquery
 from django.utils import timezone
 from datetime import datetime, timedelta
+import sys
 
 from ...utils.task_executor import TaskExecutor
-from ...models import App, TaskSchedule, TaskExecution
+from ...models import App, DataRecord, TaskSchedule, TaskExecution
 
 
 class Command(BaseCommand):
@@ -40,8 +42,19 @@ class Command(BaseCommand):
             action='store_true',
             help='列出所有可用的App'
         )
+        parser.add_argument(
+            '--yes',
+            action='store_true',
+            help='目标已禁用时不再询问，直接继续执行（用于脚本/非交互环境）'
+        )
 
     def handle(self, *args, **options):
+        self.assume_yes = options.get('yes', False)
+        date_str = options.get('date')
+        schedule_id = options.get('schedule_id')
+        app_id = options.get('app_id')
+        skip_notifications = options.get('skip_notifications', False)
+        
         if options.get('list_schedules'):
             self.list_schedules()
             return
@@ -52,9 +65,9 @@ class Command(BaseCommand):
 
         # 解析目标日期
         target_date = None
-        if options.get('date'):
+        if date_str:
             try:
-                target_date = datetime.strptime(options['date'], '%Y-%m-%d').date()
+                target_date = datetime.strptime(date_str, '%Y-%m-%d').date()
             except ValueError:
                 self.stdout.write(
                     self.style.ERROR('日期格式错误，请使用 YYYY-MM-DD 格式')
@@ -64,26 +77,17 @@ class Command(BaseCommand):
         executor = TaskExecutor()
 
         # 执行指定调度
-        if options.get('schedule_id'):
-            self.execute_schedule(executor, options['schedule_id'], target_date)
+        if schedule_id:
+            self.execute_schedule(executor, schedule_id, target_date)
             return
 
         # 执行指定App任务
-        if options.get('app_id'):
-            self.execute_app_task(
-                executor, 
-                options['app_id'], 
-                target_date,
-                options.get('skip_notifications', False)
-            )
+        if app_id:
+            self.execute_app_task(executor, app_id, target_date, skip_notifications)
             return
 
         # 执行所有App任务
-        self.execute_all_apps_task(
-            executor, 
-            target_date, 
-            options.get('skip_notifications', False)
-        )
+        self.execute_all_apps_task(executor, target_date, skip_notifications)
 
     def execute_schedule(self, executor: TaskExecutor, schedule_id: int, target_date=None):
         """执行指定的任务调度"""
@@ -99,8 +103,7 @@ class Command(BaseCommand):
             self.stdout.write(
                 self.style.WARNING(f'任务调度 "{schedule.name}" 已被禁用')
             )
-            confirm = input('是否继续执行？(y/N): ')
-            if confirm.lower() != 'y':
+            if not self.confirm_continue():
                 return
 
         app_name = schedule.app.name if schedule.app else "所有App"
@@ -108,14 +111,7 @@ class Command(BaseCommand):
             self.style.SUCCESS(f'🚀 开始执行任务调度: {schedule.name} ({app_name})')
         )
 
-        # 显示执行参数
-        params = []
-        if target_date:
-            params.append(f"目标日期: {target_date}")
-        if schedule.skip_notifications:
-            params.append("跳过通知")
-        if params:
-            self.stdout.write(f'📋 执行参数: {", ".join(params)}')
+        self.print_execution_params(target_date, schedule.skip_notifications)
 
         success = executor.execute_schedule_manual(schedule, target_date)
 
@@ -125,7 +121,10 @@ class Command(BaseCommand):
             self.stdout.write(self.style.ERROR('❌ 任务执行失败'))
 
         # 显示最新的执行记录
-        self.show_latest_execution_result(schedule)
+        if executor.last_execution:
+            self.show_execution_details(executor.last_execution)
+        else:
+            self.show_latest_execution_result(schedule)
 
     def execute_app_task(self, executor: TaskExecutor, app_id: int, target_date=None, skip_notifications=False):
         """执行指定App的任务"""
@@ -141,22 +140,14 @@ class Command(BaseCommand):
             self.stdout.write(
                 self.style.WARNING(f'App "{app.name}" 已被禁用')
             )
-            confirm = input('是否继续执行？(y/N): ')
-            if confirm.lower() != 'y':
+            if not self.confirm_continue():
                 return
 
         self.stdout.write(
             self.style.SUCCESS(f'🚀 开始执行App任务: {app.name} ({app.get_platform_display()})')
         )
 
-        # 显示执行参数
-        params = []
-        if target_date:
-            params.append(f"目标日期: {target_date}")
-        if skip_notifications:
-            params.append("跳过通知")
-        if params:
-            self.stdout.write(f'📋 执行参数: {", ".join(params)}')
+        self.print_execution_params(target_date, skip_notifications)
 
         success = executor.execute_manual_task(
             app_id=app_id,
@@ -170,7 +161,7 @@ class Command(BaseCommand):
             self.stdout.write(self.style.ERROR('❌ 任务执行失败'))
 
         # 显示最新的执行记录
-        latest_execution = TaskExecution.objects.filter(
+        latest_execution = executor.last_execution or TaskExecution.objects.select_related('app', 'schedule').filter(
             app=app,
             schedule__isnull=True
         ).order_by('-created_at').first()
@@ -180,24 +171,17 @@ class Command(BaseCommand):
 
     def execute_all_apps_task(self, executor: TaskExecutor, target_date=None, skip_notifications=False):
         """执行所有App的任务"""
-        active_apps = App.objects.filter(is_active=True)
+        active_app_count = App.objects.filter(is_active=True).count()
         
-        if not active_apps.exists():
+        if not active_app_count:
             self.stdout.write(self.style.WARNING('没有找到活跃的App'))
             return
 
         self.stdout.write(
-            self.style.SUCCESS(f'🚀 开始执行所有App任务 (共 {active_apps.count()} 个App)')
+            self.style.SUCCESS(f'🚀 开始执行所有App任务 (共 {active_app_count} 个App)')
         )
 
-        # 显示执行参数
-        params = []
-        if target_date:
-            params.append(f"目标日期: {target_date}")
-        if skip_notifications:
-            params.append("跳过通知")
-        if params:
-            self.stdout.write(f'📋 执行参数: {", ".join(params)}')
+        self.print_execution_params(target_date, skip_notifications)
 
         success = executor.execute_manual_task(
             app_id=None,
@@ -211,7 +195,7 @@ class Command(BaseCommand):
             self.stdout.write(self.style.ERROR('❌ 任务执行失败'))
 
         # 显示最新的执行记录
-        latest_execution = TaskExecution.objects.filter(
+        latest_execution = executor.last_execution or TaskExecution.objects.select_related('app', 'schedule').filter(
             app__isnull=True,
             schedule__isnull=True
         ).order_by('-created_at').first()
@@ -219,45 +203,70 @@ class Command(BaseCommand):
         if latest_execution:
             self.show_execution_details(latest_execution)
 
+    def print_execution_params(self, target_date=None, skip_notifications=False):
+        """显示执行参数"""
+        params = []
+        if target_date:
+            params.append(f"目标日期: {target_date}")
+        if skip_notifications:
+            params.append("跳过通知")
+        if params:
+            self.stdout.write(f'📋 执行参数: {", ".join(params)}')
+
+    def confirm_continue(self):
+        """确认是否继续执行；指定 --yes 时直接继续，非交互环境下未指定 --yes 则放弃执行"""
+        if self.assume_yes:
+            return True
+        if not sys.stdin.isatty():
+            self.stdout.write(
+                self.style.ERROR('❌ 非交互环境无法确认，已取消执行；如需继续请添加 --yes 参数')
+            )
+            return False
+        confirm = input('是否继续执行？(y/N): ')
+        return confirm.lower() == 'y'
+
     def list_schedules(self):
         """列出所有任务调度"""
         self.stdout.write(self.style.SUCCESS('📋 任务调度列表'))
         self.stdout.write('='*60)
 
-        schedules = TaskSchedule.objects.all().order_by('name')
+        # 最后执行状态通过相关子查询一并取出，避免逐个调度查询
+        latest_executions = TaskExecution.objects.filter(
+            schedule=OuterRef('pk')
+        ).order_by('-created_at')
+        schedules = TaskSchedule.objects.select_related('app').only(
+            'id', 'name', 'is_active', 'frequency', 'hour', 'minute',
+            'weekday', 'day_of_month', 'app__name'
+        ).annotate(
+            last_exec_status=Subquery(latest_executions.values('status')[:1]),
+            last_exec_created_at=Subquery(latest_executions.values('created_at')[:1]),
+        ).order_by('name')
         
-        if not schedules.exists():
-            self.stdout.write(self.style.WARNING('没有找到任务调度'))
-            return
-
-        for schedule in schedules:
+        # 分批流式读取，避免一次性加载全部调度
+        listed_count = 0
+        for schedule in schedules.iterator(chunk_size=500):
+            listed_count += 1
             status_emoji = '🟢' if schedule.is_active else '🔴'
             app_name = schedule.app.name if schedule.app else "所有App"
             cron_expr = schedule.get_cron_expression()
             
             # 最后执行状态
-            last_exec = TaskExecution.objects.filter(
-                schedule=schedule
-            ).order_by('-created_at').first()
-            
             last_status = ""
-            if last_exec:
-                status_emoji_map = {
-                    'success': '✅',
-                    'failed': '❌',
-                    'running': '🔄',
-                    'pending': '⏳'
-                }
-                status_emoji_exec = status_emoji_map.get(last_exec.status, '❓')
-                last_status = f" (最后: {status_emoji_exec} {last_exec.created_at.strftime('%m-%d %H:%M')})"
+            if schedule.last_exec_created_at:
+                status_emoji_exec = TaskExecution.STATUS_EMOJI.get(schedule.last_exec_status, '❓')
+                last_status = f" (最后: {status_emoji_exec} {schedule.last_exec_created_at.strftime('%m-%d %H:%M')})"
 
             self.stdout.write(
                 f'{status_emoji} [{schedule.id:2d}] {schedule.name} - {app_name}'
             )
             self.stdout.write(
-                f'     📅 {schedule.get_frequency_display()} {schedule.hour:02d}:{schedule.minute:02d} '
+                f'     📅 {TaskSchedule.FREQUENCY_DISPLAY.get(schedule.frequency, schedule.frequency)} {schedule.hour:02d}:{schedule.minute:02d} '
                 f'({cron_expr}){last_status}'
             )
+        
+        if not listed_count:
+            self.stdout.write(self.style.WARNING('没有找到任务调度'))
+            return
             
         self.stdout.write('='*60)
         self.stdout.write('💡 使用 --schedule-id <ID> 执行指定调度')
@@ -267,25 +276,28 @@ class Command(BaseCommand):
         self.stdout.write(self.style.SUCCESS('📱 App列表'))
         self.stdout.write('='*60)
 
-        apps = App.objects.all().order_by('name')
+        # 最近数据记录通过相关子查询一并取出，避免逐个App查询
+        latest_records = DataRecord.objects.filter(
+            app=OuterRef('pk')
+        ).order_by('-date')
+        apps = App.objects.only(
+            'id', 'name', 'platform', 'is_active', 'bundle_id'
+        ).annotate(
+            latest_record_date=Subquery(latest_records.values('date')[:1]),
+            latest_record_downloads=Subquery(latest_records.values('downloads')[:1]),
+        ).order_by('name')
         
-        if not apps.exists():
-            self.stdout.write(self.style.WARNING('没有找到App'))
-            return
-
-        for app in apps:
+        # 分批流式读取，避免一次性加载全部App
+        listed_count = 0
+        for app in apps.iterator(chunk_size=500):
+            listed_count += 1
             status_emoji = '🟢' if app.is_active else '🔴'
             platform_emoji = '🍎' if app.platform == 'ios' else '🤖'
             
             # 最近数据记录
-            from ...models import DataRecord
-            latest_record = DataRecord.objects.filter(
-                app=app
-            ).order_by('-date').first()
-            
             latest_data = ""
-            if latest_record:
-                latest_data = f" (最近数据: {latest_record.date}, 下载: {latest_record.downloads})"
+            if app.latest_record_date:
+                latest_data = f" (最近数据: {app.latest_record_date}, 下载: {app.latest_record_downloads})"
 
             self.stdout.write(
                 f'{status_emoji} [{app.id:2d}] {platform_emoji} {app.name}'
@@ -293,13 +305,17 @@ class Command(BaseCommand):
             self.stdout.write(
                 f'     📦 {app.bundle_id}{latest_data}'
             )
+        
+        if not listed_count:
+            self.stdout.write(self.style.WARNING('没有找到App'))
+            return
             
         self.stdout.write('='*60)
         self.stdout.write('💡 使用 --app-id <ID> 执行指定App任务')
 
     def show_latest_execution_result(self, schedule: TaskSchedule):
         """显示最新的执行结果"""
-        latest_execution = TaskExecution.objects.filter(
+        latest_execution = TaskExecution.objects.select_related('app', 'schedule').filter(
             schedule=schedule
         ).order_by('-created_at').first()
 
@@ -311,27 +327,14 @@ class Command(BaseCommand):
         self.stdout.write('\n📊 执行结果:')
         self.stdout.write('-' * 30)
         
-        status_emoji = {
-            'success': '✅',
-            'failed': '❌',
-            'running': '🔄',
-            'pending': '⏳',
-            'timeout': '⏰',
-            'cancelled': '🚫'
-        }.get(execution.status, '❓')
+        status_emoji = TaskExecution.STATUS_EMOJI.get(execution.status, '❓')
         
         self.stdout.write(f'状态: {status_emoji} {execution.get_status_display()}')
         
         if execution.started_at and execution.completed_at:
             duration = execution.duration_seconds
             if duration:
-                if duration < 60:
-                    duration_str = f'{duration}秒'
-                else:
-                    minutes = duration // 60
-                    seconds = duration % 60
-                    duration_str = f'{minutes}分{seconds}秒'
-                self.stdout.write(f'执行时长: {duration_str}')
+                self.stdout.write(f'执行时长: {TaskExecution.format_duration(duration)}')
         
         if execution.status in ['success', 'failed']:
             self.stdout.write(f'成功处理: {execution.success_count}')
@@ -344,11 +347,12 @@ class Command(BaseCommand):
         
         if execution.error_log and execution.status == 'failed':
             self.stdout.write(f'\n❌ 错误信息:')
-            # 只显示前3行错误信息
-            error_lines = execution.error_log.strip().split('\n')[:3]
-            for line in error_lines:
-                self.stdout.write(f'   {line}')
-            if len(execution.error_log.strip().split('\n')) > 3:
+            # 只显示最后3行错误信息（traceback 的结尾才是异常本身），
+            # 从右侧最多切分出4段即可判断前面是否还有更多
+            error_lines = execution.error_log.strip().rsplit('\n', 3)
+            if len(error_lines) > 3:
                 self.stdout.write('   ...')
+            for line in error_lines[-3:]:
+                self.stdout.write(f'   {line}')
         
         self.stdout.write('-' * 30)
\ No newline at end of file
@@ -1,7 +1,8 @@
 from django.core.management.base import BaseCommand
+from django.db.models import Count, Sum
 from django.utils import timezone
-from datetime import datetime, timedelta
-import random
+from datetime import timedelta
+import numpy as np
 from ...models import App, DataRecord
 
 
@@ -25,10 +26,17 @@ class Command(BaseCommand):
             action='store_true',
             help='在数据中包含一些异常值'
         )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            help='随机数种子，用于生成可复现的数据'
+        )
 
     def handle(self, *args, **options):
         days = options['days']
         with_anomalies = options['with_anomalies']
+        # 所有App共用同一个随机数生成器
+        self.rng = np.random.default_rng(options.get('seed'))
         
         # 获取要处理的App
         app_filter = {'is_active': True}
@@ -53,97 +61,110 @@ class Command(BaseCommand):
 
     def generate_app_data(self, app, days, with_anomalies):
         """为单个App生成数据"""
-        base_downloads = random.randint(1000, 10000)
-        base_sessions = int(base_downloads * random.uniform(0.6, 0.9))
-        base_revenue = random.uniform(100, 1000)
+        rng = self.rng
+        base_downloads = int(rng.integers(1000, 10000, endpoint=True))
+        base_sessions = int(base_downloads * rng.uniform(0.6, 0.9))
+        base_revenue = rng.uniform(100, 1000)
         
-        anomaly_days = set()
-        if with_anomalies:
-            # 随机选择几天作为异常日
-            num_anomalies = random.randint(2, max(3, days // 10))
-            anomaly_days = set(random.sample(range(days), num_anomalies))
+        base_date = timezone.localdate() - timedelta(days=days-1)
+        dates = [base_date + timedelta(days=i) for i in range(days)]
         
-        created_count = 0
-        updated_count = 0
+        # 生成基础趋势 (轻微上升或下降)
+        trend_factor = 1 + (np.arange(days) / days) * rng.uniform(-0.3, 0.5, days)
         
-        for i in range(days):
-            date = (datetime.now() - timedelta(days=days-i-1)).date()
-            
-            # 生成基础趋势 (轻微上升或下降)
-            trend_factor = 1 + (i / days) * random.uniform(-0.3, 0.5)
-            
-            # 添加随机波动
-            daily_variation = random.uniform(0.8, 1.2)
-            
-            # 周末效应 (周末数据通常较低)
-            weekday = date.weekday()
-            weekend_factor = 0.7 if weekday >= 5 else 1.0
+        # 添加随机波动
+        daily_variation = rng.uniform(0.8, 1.2, days)
+        
+        # 周末效应 (周末数据通常较低)
+        weekdays = np.fromiter((d.weekday() for d in dates), dtype=np.int64, count=days)
+        weekend_factor = np.where(weekdays >= 5, 0.7, 1.0)
+        
+        # 计算基础值
+        scale = trend_factor * daily_variation * weekend_factor
+        downloads = base_downloads * scale
+        sessions = base_sessions * scale
+        revenue = base_revenue * scale
+        
+        # 添加异常值
+        is_anomaly = np.zeros(days, dtype=bool)
+        if with_anomalies:
+            # 随机选择几天作为异常日
+            num_anomalies = int(rng.integers(2, max(3, days // 10), endpoint=True))
+            anomaly_idx = np.sort(rng.choice(days, size=num_anomalies, replace=False))
+            is_anomaly[anomaly_idx] = True
             
-            # 计算基础值
-            downloads = int(base_downloads * trend_factor * daily_variation * weekend_factor)
-            sessions = int(base_sessions * trend_factor * daily_variation * weekend_factor)
-            revenue = base_revenue * trend_factor * daily_variation * weekend_factor
+            # 暴增 / 暴跌各占一半概率
+            is_spike = rng.random(num_anomalies) < 0.5
+            multiplier = np.where(
+                is_spike,
+                rng.uniform(2.5, 5.0, num_anomalies),
+                rng.uniform(0.1, 0.4, num_anomalies)
+            )
+            downloads[anomaly_idx] *= multiplier
+            # 暴增时会话增长通常小于下载
+            sessions[anomaly_idx] *= np.where(is_spike, multiplier * 0.8, multiplier)
+            revenue[anomaly_idx] *= np.where(is_spike, multiplier * 0.9, multiplier)
             
-            # 添加异常值
-            if i in anomaly_days:
-                anomaly_type = random.choice(['spike', 'drop'])
-                if anomaly_type == 'spike':
-                    # 暴增
-                    multiplier = random.uniform(2.5, 5.0)
-                    downloads = int(downloads * multiplier)
-                    sessions = int(sessions * multiplier * 0.8)  # 会话增长通常小于下载
-                    revenue *= multiplier * 0.9
-                    self.stdout.write(f'  📈 异常峰值: {date}')
+            for i, spike in zip(anomaly_idx, is_spike):
+                if spike:
+                    self.stdout.write(f'  📈 异常峰值: {dates[i]}')
                 else:
-                    # 暴跌
-                    multiplier = random.uniform(0.1, 0.4)
-                    downloads = int(downloads * multiplier)
-                    sessions = int(sessions * multiplier)
-                    revenue *= multiplier
-                    self.stdout.write(f'  📉 异常低值: {date}')
-            
-            # 确保最小值
-            downloads = max(downloads, 0)
-            sessions = max(sessions, 0)
-            revenue = max(revenue, 0)
-            
-            # 生成评分 (4.0-5.0之间，偶尔有低分)
-            rating = round(random.uniform(4.0, 5.0), 1)
-            if random.random() < 0.1:  # 10%概率出现低分
-                rating = round(random.uniform(2.5, 3.9), 1)
-            
-            # 创建或更新记录
-            record, created = DataRecord.objects.update_or_create(
+                    self.stdout.write(f'  📉 异常低值: {dates[i]}')
+        
+        # 确保最小值
+        downloads = np.maximum(downloads.astype(np.int64), 0)
+        sessions = np.maximum(sessions.astype(np.int64), 0)
+        revenue = np.maximum(revenue, 0)
+        
+        # 生成评分 (4.0-5.0之间，10%概率出现低分)
+        rating = np.round(rng.uniform(4.0, 5.0, days), 1)
+        low_rating = rng.random(days) < 0.1
+        rating[low_rating] = np.round(rng.uniform(2.5, 3.9, int(low_rating.sum())), 1)
+        
+        records = [
+            DataRecord(
                 app=app,
                 date=date,
-                defaults={
-                    'downloads': downloads,
-                    'sessions': sessions,
-                    'revenue': round(revenue, 2),
-                    'rating': rating,
-                    'raw_data': {
-                        'generated': True,
-                        'base_downloads': base_downloads,
-                        'trend_factor': round(trend_factor, 3),
-                        'daily_variation': round(daily_variation, 3),
-                        'weekend_factor': weekend_factor,
-                        'anomaly': i in anomaly_days
-                    }
+                downloads=int(downloads[i]),
+                sessions=int(sessions[i]),
+                revenue=round(float(revenue[i]), 2),
+                rating=float(rating[i]),
+                raw_data={
+                    'generated': True,
+                    'base_downloads': base_downloads,
+                    'trend_factor': round(float(trend_factor[i]), 3),
+                    'daily_variation': round(float(daily_variation[i]), 3),
+                    'weekend_factor': float(weekend_factor[i]),
+                    'anomaly': bool(is_anomaly[i])
                 }
             )
-            
-            if created:
-                created_count += 1
-            else:
-                updated_count += 1
+            for i, date in enumerate(dates)
+        ]
+        
+        # 预先查询已存在的日期，仅用于区分创建/更新数量
+        existing_count = DataRecord.objects.filter(app=app, date__in=dates).count()
+        
+        # 单条语句批量创建或更新记录
+        DataRecord.objects.bulk_create(
+            records,
+            update_conflicts=True,
+            unique_fields=['app', 'date'],
+            update_fields=['downloads', 'sessions', 'revenue', 'rating', 'raw_data'],
+            batch_size=1000
+        )
+        created_count = len(records) - existing_count
+        updated_count = existing_count
         
         self.stdout.write(
             f'  ✅ 完成 - 创建: {created_count}, 更新: {updated_count}'
         )
         
         # 显示数据概览
-        total_downloads = sum(DataRecord.objects.filter(app=app).values_list('downloads', flat=True))
-        avg_downloads = total_downloads // DataRecord.objects.filter(app=app).count() if DataRecord.objects.filter(app=app).count() > 0 else 0
+        stats = DataRecord.objects.filter(app=app).aggregate(
+            total=Sum('downloads'), count=Count('id')
+        )
+        total_downloads = stats['total'] or 0
+        avg_downloads = total_downloads // stats['count'] if stats['count'] else 0
         
         self.stdout.write(
             f'  📊 数据概览 - 总下载: {total_downloads:,}, 平均日下载: {avg_downloads:,}'
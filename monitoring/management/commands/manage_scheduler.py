@@ -1,14 +1,25 @@
 from django.core.management.base import BaseCommand
 from django.utils import timezone
-from datetime import datetime
-import time
+from datetime import datetime, timedelta
 import signal
 import sys
+import threading
 
 from ...utils.task_executor import get_global_scheduler, TaskScheduler
 from ...models import TaskSchedule, TaskExecution
 
 
+# 展示活跃调度及判断执行时间所需的字段
+_SCHEDULE_DISPLAY_FIELDS = (
+    'id', 'name', 'frequency', 'hour', 'minute', 'weekday', 'day_of_month', 'app__name'
+)
+
+
+def _app_name(app):
+    """调度/执行记录关联的App名称，未关联App时表示处理所有App"""
+    return app.name if app else "所有App"
+
+
 class Command(BaseCommand):
     help = '管理任务调度器 - 启动、停止、查看状态'
 
@@ -43,15 +54,22 @@ class Command(BaseCommand):
 
     def start_scheduler(self, daemon=False):
         """启动调度器"""
+        # 已有调度器进程在运行时不再启动，避免重复调度并覆盖其PID文件
+        if TaskScheduler.is_running():
+            self.stdout.write(self.style.WARNING('⚠️ 调度器已在其他进程中运行，请先执行 manage_scheduler stop'))
+            return
+        
         self.stdout.write(self.style.SUCCESS('🚀 启动任务调度器...'))
         
-        # 显示当前活跃的调度
-        active_schedules = TaskSchedule.objects.filter(is_active=True)
-        if active_schedules.exists():
-            self.stdout.write(f'📋 发现 {active_schedules.count()} 个活跃的任务调度:')
+        # 显示当前活跃的调度（一次性取出并关联 app，避免逐条查询）
+        active_schedules = list(
+            TaskSchedule.objects.filter(is_active=True).select_related('app').only(*_SCHEDULE_DISPLAY_FIELDS)
+        )
+        if active_schedules:
+            self.stdout.write(f'📋 发现 {len(active_schedules)} 个活跃的任务调度:')
             for schedule in active_schedules:
                 cron_expr = schedule.get_cron_expression()
-                app_name = schedule.app.name if schedule.app else "所有App"
+                app_name = _app_name(schedule.app)
                 self.stdout.write(f'  • {schedule.name} - {app_name} ({cron_expr})')
         else:
             self.stdout.write(self.style.WARNING('⚠️ 没有找到活跃的任务调度'))
@@ -63,8 +81,11 @@ class Command(BaseCommand):
             self.stdout.write('🔄 以守护进程模式启动调度器...')
             
             # 设置信号处理器
+            stop_event = threading.Event()
+            
             def signal_handler(signum, frame):
                 self.stdout.write('\n🛑 收到停止信号，正在优雅关闭调度器...')
+                stop_event.set()
                 scheduler.stop()
                 self.stdout.write(self.style.SUCCESS('✅ 调度器已停止'))
                 sys.exit(0)
@@ -72,14 +93,14 @@ class Command(BaseCommand):
             signal.signal(signal.SIGINT, signal_handler)
             signal.signal(signal.SIGTERM, signal_handler)
             
-            # 启动调度器
+            # 启动调度器；只有常驻的守护进程记录PID文件，供 status 查询
             scheduler.start()
+            scheduler.write_pid_file()
             self.stdout.write(self.style.SUCCESS('✅ 调度器已启动，按 Ctrl+C 停止'))
             
-            # 保持运行
+            # 保持运行：阻塞等待停止信号，而不是每秒轮询一次
             try:
-                while scheduler.running:
-                    time.sleep(1)
+                stop_event.wait()
             except KeyboardInterrupt:
                 signal_handler(signal.SIGINT, None)
         else:
@@ -102,59 +123,55 @@ class Command(BaseCommand):
         self.stdout.write(self.style.SUCCESS('📊 任务调度器状态'))
         self.stdout.write('='*50)
         
-        # 调度器运行状态
-        scheduler = get_global_scheduler()
-        if scheduler.running:
+        # 调度器运行状态：调度器通常运行在另一个进程中，通过PID文件判断
+        if TaskScheduler.is_running():
             self.stdout.write(self.style.SUCCESS('🟢 调度器状态: 运行中'))
         else:
             self.stdout.write(self.style.ERROR('🔴 调度器状态: 已停止'))
         
         # 活跃的调度
-        active_schedules = TaskSchedule.objects.filter(is_active=True)
-        self.stdout.write(f'\n📋 活跃调度数量: {active_schedules.count()}')
+        active_schedules = list(
+            TaskSchedule.objects.filter(is_active=True).select_related('app').only(*_SCHEDULE_DISPLAY_FIELDS)
+        )
+        self.stdout.write(f'\n📋 活跃调度数量: {len(active_schedules)}')
         
-        if active_schedules.exists():
-            for schedule in active_schedules:
-                cron_expr = schedule.get_cron_expression()
-                app_name = schedule.app.name if schedule.app else "所有App"
-                self.stdout.write(f'  • {schedule.name} - {app_name} ({cron_expr})')
+        for schedule in active_schedules:
+            cron_expr = schedule.get_cron_expression()
+            app_name = _app_name(schedule.app)
+            self.stdout.write(f'  • {schedule.name} - {app_name} ({cron_expr})')
         
         # 最近执行记录
-        recent_executions = TaskExecution.objects.order_by('-created_at')[:5]
-        if recent_executions.exists():
-            self.stdout.write(f'\n📝 最近 {recent_executions.count()} 次执行:')
+        recent_executions = list(
+            TaskExecution.objects.select_related('schedule', 'app').only(
+                'status', 'created_at', 'duration_seconds', 'schedule__name', 'app__name'
+            ).order_by('-created_at')[:5]
+        )
+        if recent_executions:
+            self.stdout.write(f'\n📝 最近 {len(recent_executions)} 次执行:')
             for execution in recent_executions:
-                status_emoji = {
-                    'success': '✅',
-                    'failed': '❌',
-                    'running': '🔄',
-                    'pending': '⏳',
-                    'timeout': '⏰',
-                    'cancelled': '🚫'
-                }.get(execution.status, '❓')
+                status_emoji = TaskExecution.STATUS_EMOJI.get(execution.status, '❓')
                 
                 schedule_name = execution.schedule.name if execution.schedule else "手动任务"
-                app_name = execution.app.name if execution.app else "所有App"
+                app_name = _app_name(execution.app)
                 time_str = execution.created_at.strftime('%Y-%m-%d %H:%M:%S')
                 
                 duration = ""
                 if execution.duration_seconds:
-                    if execution.duration_seconds < 60:
-                        duration = f" ({execution.duration_seconds}秒)"
-                    else:
-                        minutes = execution.duration_seconds // 60
-                        seconds = execution.duration_seconds % 60
-                        duration = f" ({minutes}分{seconds}秒)"
+                    duration = f" ({TaskExecution.format_duration(execution.duration_seconds)})"
                 
                 self.stdout.write(f'  {status_emoji} {time_str} - {schedule_name} ({app_name}){duration}')
         
         # 正在运行的任务
-        running_executions = TaskExecution.objects.filter(status='running')
-        if running_executions.exists():
-            self.stdout.write(f'\n🔄 正在运行的任务: {running_executions.count()} 个')
+        running_executions = list(
+            TaskExecution.objects.filter(status='running').select_related('schedule', 'app').only(
+                'started_at', 'schedule__name', 'app__name'
+            )
+        )
+        if running_executions:
+            self.stdout.write(f'\n🔄 正在运行的任务: {len(running_executions)} 个')
             for execution in running_executions:
                 schedule_name = execution.schedule.name if execution.schedule else "手动任务"
-                app_name = execution.app.name if execution.app else "所有App"
+                app_name = _app_name(execution.app)
                 started_time = execution.started_at.strftime('%H:%M:%S') if execution.started_at else "未知"
                 self.stdout.write(f'  • {schedule_name} ({app_name}) - 开始时间: {started_time}')
         
@@ -182,8 +199,8 @@ class Command(BaseCommand):
                 else:
                     self.stdout.write(self.style.ERROR('❌ 任务执行失败'))
                     
-                # 显示执行结果
-                latest_execution = TaskExecution.objects.filter(
+                # 显示执行结果（未创建新记录时回退为查询该调度最近一次执行）
+                latest_execution = executor.last_execution or TaskExecution.objects.filter(
                     schedule=schedule
                 ).order_by('-created_at').first()
                 
@@ -196,13 +213,7 @@ class Command(BaseCommand):
                     self.stdout.write(f'  发送通知: {latest_execution.notifications_sent}')
                     
                     if latest_execution.duration_seconds:
-                        duration = latest_execution.duration_seconds
-                        if duration < 60:
-                            self.stdout.write(f'  执行时长: {duration}秒')
-                        else:
-                            minutes = duration // 60
-                            seconds = duration % 60
-                            self.stdout.write(f'  执行时长: {minutes}分{seconds}秒')
+                        self.stdout.write(f'  执行时长: {TaskExecution.format_duration(latest_execution.duration_seconds)}')
                 
             except TaskSchedule.DoesNotExist:
                 self.stdout.write(self.style.ERROR(f'❌ 未找到ID为 {schedule_id} 的活跃调度'))
@@ -219,7 +230,9 @@ class Command(BaseCommand):
             self.stdout.write(f'🕐 当前时间: {now.strftime("%Y-%m-%d %H:%M:%S")}')
             self.stdout.write(f'🎯 检查时间点: {current_minute.strftime("%Y-%m-%d %H:%M")}')
             
-            schedules = TaskSchedule.objects.filter(is_active=True)
+            schedules = list(
+                TaskSchedule.objects.filter(is_active=True).select_related('app').only(*_SCHEDULE_DISPLAY_FIELDS)
+            )
             should_execute = []
             
             for schedule in schedules:
@@ -229,28 +242,28 @@ class Command(BaseCommand):
             if should_execute:
                 self.stdout.write(f'\n⏰ 在当前时间点应该执行的调度 ({len(should_execute)} 个):')
                 for schedule in should_execute:
-                    app_name = schedule.app.name if schedule.app else "所有App"
+                    app_name = _app_name(schedule.app)
                     self.stdout.write(f'  • {schedule.name} - {app_name}')
             else:
                 self.stdout.write(f'\n✅ 当前时间点没有需要执行的调度')
             
             # 显示下一个执行时间
             self.stdout.write(f'\n📅 接下来24小时内的执行计划:')
-            import calendar
-            from datetime import timedelta
+            window_start = now.replace(minute=0, second=0, microsecond=0)
+            window_end = window_start + timedelta(hours=24)
             
             for schedule in schedules[:3]:  # 只显示前3个调度的计划
-                app_name = schedule.app.name if schedule.app else "所有App"
+                app_name = _app_name(schedule.app)
                 next_times = []
                 
-                # 计算接下来24小时内的执行时间
-                check_time = now.replace(minute=0, second=0, microsecond=0)
-                for _ in range(24 * 60):  # 检查24小时 * 60分钟
-                    if scheduler._should_execute_now(schedule, check_time):
-                        next_times.append(check_time)
-                        if len(next_times) >= 3:  # 最多显示3个时间
-                            break
-                    check_time += timedelta(minutes=1)
+                # 调度每天最多触发一次（固定的时:分），只需检查窗口覆盖的两天，
+                # 无需逐分钟扫描24小时
+                first_candidate = window_start.replace(hour=schedule.hour, minute=schedule.minute)
+                for day_offset in range(2):
+                    candidate = first_candidate + timedelta(days=day_offset)
+                    if (window_start <= candidate < window_end and
+                            scheduler._should_execute_now(schedule, candidate)):
+                        next_times.append(candidate)
                 
                 if next_times:
                     times_str = ", ".join([t.strftime("%m-%d %H:%M") for t in next_times])
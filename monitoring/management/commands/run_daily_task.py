@@ -1,14 +1,56 @@
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, OutputWrapper
 from django.conf import settings
+from django.db import connection, transaction
 from django.utils import timezone
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+from io import StringIO
+import threading
 import traceback
 
-from ...models import App, Credential, DataRecord, DailyReportConfig
-from ...utils.api_clients import APIClientFactory
-from ...utils.analytics import DataAnalyzer
-from ...utils.anomaly_detector import AnomalyDetector
-from ...utils.lark_notifier import LarkNotifier
+from ...models import AlertLog, App, Credential, DataRecord, DailyReportConfig
+
+
+# 参与分析的指标字段及其缺省值（独立设备数缺失时为 None，其余为 0）
+_CURRENT_DATA_DEFAULTS = {
+    'downloads': 0,
+    'sessions': 0,
+    'deletions': 0,
+    'unique_devices': None,
+    # 下载来源细分数据
+    'downloads_app_store_search': 0,
+    'downloads_web_referrer': 0,
+    'downloads_app_referrer': 0,
+    'downloads_app_store_browse': 0,
+    'downloads_institutional': 0,
+    'downloads_other': 0,
+}
+
+
+def _slim_raw_data(raw_data: dict) -> dict:
+    """
+    去掉原始数据中的逐行报表明细，只保留汇总结果与定位信息后入库
+    
+    iOS 各报告的 instances 及 processed_data.instances_with_segments 含有完整的CSV行，
+    Android 的 raw_response.parsed_overview 是整份 overview CSV，均可按报告ID/blob_name重新获取
+    """
+    slim = dict(raw_data)
+    reports = raw_data.get('raw_data')
+    if isinstance(reports, dict):
+        slim['raw_data'] = {}
+        for name, report in reports.items():
+            if isinstance(report, dict):
+                report = {k: v for k, v in report.items() if k != 'instances'}
+                processed = report.get('processed_data')
+                if isinstance(processed, dict):
+                    report['processed_data'] = {
+                        k: v for k, v in processed.items() if k != 'instances_with_segments'
+                    }
+            slim['raw_data'][name] = report
+    raw_response = raw_data.get('raw_response')
+    if isinstance(raw_response, dict):
+        slim['raw_response'] = {k: v for k, v in raw_response.items() if k != 'parsed_overview'}
+    return slim
 
 
 class Command(BaseCommand):
@@ -39,6 +81,8 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
         self.dry_run = options.get('dry_run', False)
         self.skip_notifications = options.get('skip_notifications', False)
+        # 仅在 -v 2 及以上时格式化并输出完整的 traceback
+        self.verbosity = options.get('verbosity', 1)
         
         # 确定处理日期
         if options.get('date'):
@@ -53,8 +97,12 @@ class Command(BaseCommand):
             # 默认获取N天前的数据，N由`DATA_FETCH_DELAY_DAYS`配置决定
             # 这个延迟是为了确保Apple/Google的API数据已经完全生成并稳定
             # 默认是2天，这是一个比较安全的值，可根据实际情况在.env中调整
+            # 按项目时区（TIME_ZONE）取当天日期，而不是服务器本地时钟；
+            # 与 --date 一样统一为当天零点，API客户端与分析模块都按 datetime 处理
             delay_days = settings.DATA_FETCH_DELAY_DAYS
-            target_date = datetime.now() - timedelta(days=delay_days)
+            target_date = datetime.combine(
+                timezone.localdate() - timedelta(days=delay_days), datetime.min.time()
+            )
         
         self.stdout.write(
             self.style.SUCCESS(f'开始处理 {target_date.strftime("%Y-%m-%d")} 的数据')
@@ -68,22 +116,40 @@ class Command(BaseCommand):
         if options.get('app_id'):
             app_filter['id'] = options['app_id']
         
-        apps = App.objects.filter(**app_filter)
+        # 后续只读取这些字段（App名称、平台与包名）
+        apps = list(App.objects.filter(**app_filter).only('id', 'name', 'platform', 'bundle_id'))
         
         if not apps:
             self.stdout.write(self.style.WARNING('没有找到符合条件的App'))
             return
         
-        self.stdout.write(f'找到 {apps.count()} 个App需要处理')
+        self.stdout.write(f'找到 {len(apps)} 个App需要处理')
+        
+        # 预加载凭证与日报配置，避免在每个App的处理中重复查询
+        self.creds_by_platform = {
+            c.platform: c
+            for c in Credential.objects.filter(
+                is_active=True, platform__in={app.platform for app in apps}
+            )
+        }
+        # 日报与错误通知都只用到日报Webhook地址
+        self.report_cfg_by_app = {
+            c.app_id: c
+            for c in DailyReportConfig.objects.filter(is_active=True, app__in=apps).only('app_id', 'lark_webhook_daily')
+        }
+        
+        # 初始化工具类（依赖 pandas、Google API 等较重的库，仅在真正执行任务时才导入）
+        from ...utils.analytics import DataAnalyzer
+        from ...utils.anomaly_detector import AnomalyDetector
+        from ...utils.lark_notifier import LarkNotifier
         
-        # 初始化工具类
         self.analyzer = DataAnalyzer()
         self.detector = AnomalyDetector()
         self.notifier = LarkNotifier()
         
         # 统计信息
         self.stats = {
-            'total_apps': apps.count(),
+            'total_apps': len(apps),
             'success_count': 0,
             'error_count': 0,
             'alerts_generated': 0,
@@ -91,44 +157,108 @@ class Command(BaseCommand):
             'errors': []
         }
         
-        # 处理每个App
-        for app in apps:
-            try:
-                self.stdout.write(f'\n📱 处理App: {app.name} ({app.get_platform_display()})')
-                self.process_single_app(app, target_date)
-                self.stats['success_count'] += 1
-                
-            except Exception as e:
-                self.stats['error_count'] += 1
-                error_msg = f'处理App {app.name} 时发生错误: {str(e)}'
-                self.stats['errors'].append(error_msg)
-                self.stdout.write(self.style.ERROR(f'❌ {error_msg}'))
-                self.stderr.write(traceback.format_exc())
-                
-                # 发送错误通知（如果不是试运行模式）
-                if not self.dry_run and not self.skip_notifications:
-                    self.send_error_notification(app, str(e))
+        # 并发处理每个App：耗时主要在API请求和Webhook推送等网络I/O上
+        self._lock = threading.Lock()
+        self.clients_by_platform = {}
+        # iOS与Android的API限流和鉴权互相独立，各用一个线程池，避免一个平台的慢请求阻塞另一个平台
+        ios_apps = [app for app in apps if app.platform == 'ios']
+        android_apps = [app for app in apps if app.platform == 'android']
+        ios_pool = ThreadPoolExecutor(max_workers=max(1, min(settings.DAILY_TASK_IOS_WORKERS, len(ios_apps))))
+        android_pool = ThreadPoolExecutor(max_workers=max(1, min(settings.DAILY_TASK_ANDROID_WORKERS, len(android_apps))))
+        # 通知推送使用独立的线程池，同一App的多条告警与日报可以并发发送
+        self._notify_pool = ThreadPoolExecutor(max_workers=settings.DAILY_TASK_CONCURRENCY)
+        try:
+            futures = [ios_pool.submit(self.process_app_safely, app, target_date) for app in ios_apps]
+            futures += [android_pool.submit(self.process_app_safely, app, target_date) for app in android_apps]
+            # 各App的输出与成功/失败统计在主线程中按完成顺序汇总
+            for future in as_completed(futures):
+                result = future.result()
+                self.stdout.write(result['output'], ending='')
+                if result['error']:
+                    self.stats['error_count'] += 1
+                    self.stats['errors'].append(result['error'])
+                    if result['traceback']:
+                        self.stderr.write(result['traceback'])
+                else:
+                    self.stats['success_count'] += 1
+        except BaseException:
+            # 执行器超时(SIGALRM)或 Ctrl+C 时取消尚未开始的App与通知任务，不再等待其全部执行完
+            for pool in (ios_pool, android_pool, self._notify_pool):
+                pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        else:
+            ios_pool.shutdown(wait=True)
+            android_pool.shutdown(wait=True)
+            self._notify_pool.shutdown(wait=True)
         
         # 输出汇总信息
         self.print_summary()
 
-    def process_single_app(self, app: App, target_date: datetime):
+    def process_app_safely(self, app: App, target_date: datetime):
+        """
+        在工作线程中处理单个App，输出先写入缓冲区，避免多个App的日志交错
+        
+        Returns:
+            {'output': 该App的完整输出, 'error': 错误信息或None, 'traceback': 错误堆栈或None}
+        """
+        buffer = StringIO()
+        out = OutputWrapper(buffer)
+        result = {'output': '', 'error': None, 'traceback': None}
+        try:
+            out.write(f'\n📱 处理App: {app.name} ({app.get_platform_display()})')
+            self.process_single_app(app, target_date, out)
+            
+        except Exception as e:
+            error_msg = f'处理App {app.name} 时发生错误: {str(e)}'
+            result['error'] = error_msg
+            if self.verbosity >= 2:
+                result['traceback'] = traceback.format_exc()
+            out.write(self.style.ERROR(f'❌ {error_msg}'))
+            
+            # 发送错误通知（如果不是试运行模式）
+            if not self.dry_run and not self.skip_notifications:
+                self.send_error_notification(app, str(e))
+        
+        finally:
+            # 工作线程各自持有数据库连接，结束时关闭以免连接泄漏
+            connection.close()
+        
+        result['output'] = buffer.getvalue()
+        return result
+
+    def get_api_client(self, platform: str, credential: Credential):
+        """获取平台的API客户端，同一平台的App共用一个客户端，复用其访问令牌与GCS客户端"""
+        with self._lock:
+            client = self.clients_by_platform.get(platform)
+            if client is None:
+                from ...utils.api_clients import APIClientFactory
+                
+                config_data = credential.get_config_data()
+                if platform == 'ios':
+                    client = APIClientFactory.create_apple_client(config_data)
+                else:
+                    client = APIClientFactory.create_google_client(config_data)
+                self.clients_by_platform[platform] = client
+        return client
+
+    def increment_stat(self, key: str, amount: int = 1):
+        """线程安全地累加统计计数"""
+        with self._lock:
+            self.stats[key] += amount
+
+    def process_single_app(self, app: App, target_date: datetime, out: OutputWrapper):
         """处理单个App的数据"""
+        platform_display = app.get_platform_display()
         
         # 1. 获取API凭证
-        try:
-            credential = Credential.objects.get(platform=app.platform, is_active=True)
-        except Credential.DoesNotExist:
-            raise Exception(f'未找到{app.get_platform_display()}平台的有效凭证')
+        credential = self.creds_by_platform.get(app.platform)
+        if credential is None:
+            raise Exception(f'未找到{platform_display}平台的有效凭证')
         
-        # 2. 创建API客户端
-        config_data = credential.get_config_data()
-        if app.platform == 'ios':
-            client = APIClientFactory.create_apple_client(config_data)
-        else:
-            client = APIClientFactory.create_google_client(config_data)
+        # 2. 获取API客户端
+        client = self.get_api_client(app.platform, credential)
         
-        self.stdout.write(f'  🔌 已连接到 {app.get_platform_display()} API')
+        out.write(f'  🔌 已连接到 {platform_display} API')
         
         # 3. 获取数据
         if app.platform == 'ios':
@@ -141,120 +271,101 @@ class Command(BaseCommand):
         if 'error' in raw_data:
             raise Exception(f'API数据获取失败: {raw_data["error"]}')
         
+        # 数据的实际日期：iOS 即 target_date；Android 用 effective_date（若有且可解析）
+        data_date_for_analysis = target_date
+        eff_str = raw_data.get('effective_date') if app.platform == 'android' else None
+        if eff_str:
+            try:
+                data_date_for_analysis = datetime.strptime(eff_str, '%Y-%m-%d')
+            except Exception:
+                pass
+        
         # 输出数据与有效日期信息（Android特别关注effective_date）
-        eff = raw_data.get('effective_date')
-        if app.platform == 'android' and eff and eff != target_date.strftime('%Y-%m-%d'):
-            self.stdout.write(f'  📊 获取到数据 - 下载量: {raw_data["downloads"]}, 会话数: {raw_data["sessions"]}（实际日期: {eff}）')
+        if eff_str and eff_str != target_date.strftime('%Y-%m-%d'):
+            out.write(f'  📊 获取到数据 - 下载量: {raw_data["downloads"]}, 会话数: {raw_data["sessions"]}（实际日期: {eff_str}）')
         else:
-            self.stdout.write(f'  📊 获取到数据 - 下载量: {raw_data["downloads"]}, 会话数: {raw_data["sessions"]}')
-        
-        # 4. 保存数据记录
-        if not self.dry_run:
-            if app.platform == 'android':
-                # 缺口补齐：将本次 overview 中出现的、且尚未入库的最近一段日期（不晚于目标日期或最大可用日期）补齐
-                daily_map = raw_data.get('daily_map') or {}
-                if daily_map:
-                    # 仅考虑不晚于 max_available_date 的日期，避免未来空值
-                    max_date_str = raw_data.get('max_available_date')
-                    date_keys = sorted([d for d in daily_map.keys() if not max_date_str or d <= max_date_str])
-                    created_count = 0
-                    for d_str in date_keys:
-                        try:
-                            d_obj = datetime.strptime(d_str, '%Y-%m-%d').date()
-                        except Exception:
-                            continue
-                        # 若记录已存在则跳过
-                        if DataRecord.objects.filter(app=app, date=d_obj).exists():
-                            continue
-                        d_stats = daily_map[d_str]
-                        DataRecord.objects.update_or_create(
-                            app=app,
-                            date=d_obj,
-                            defaults={
-                                'downloads': int(d_stats.get('downloads', 0)),
-                                'sessions': 0,
-                                'deletions': int(d_stats.get('deletions', 0)),
-                                'unique_devices': None,
-                                'revenue': 0,
-                                'rating': None,
-                                'raw_data': {'source': 'gplay_overview', 'note': 'backfill from overview', 'blob_name': (raw_data.get('raw_response') or {}).get('blob_name')}
-                            }
+            out.write(f'  📊 获取到数据 - 下载量: {raw_data["downloads"]}, 会话数: {raw_data["sessions"]}')
+        
+        current_data = {
+            key: raw_data.get(key, default) for key, default in _CURRENT_DATA_DEFAULTS.items()
+        }
+        
+        # 事务只包住数据库写入：数据记录（含Android缺口补齐）在此提交，告警日志在检测后以单条批量 INSERT 写入。
+        # 分析与检测依赖已写入的记录，且内部会吞掉数据库异常，放在事务之外可避免事务被中止后仍继续执行；
+        # Webhook推送同样放在事务之外，避免网络延迟占用数据库事务
+        with transaction.atomic():
+            # 4. 保存数据记录
+            if not self.dry_run:
+                if app.platform == 'android':
+                    # 本次“有效日期”的记录日期，该日期的记录由下方的完整数据写入
+                    record_date = data_date_for_analysis.date()
+                
+                    # 缺口补齐：将本次 overview 中出现的、且尚未入库的最近一段日期（不晚于目标日期或最大可用日期）补齐
+                    daily_map = raw_data.get('daily_map') or {}
+                    if daily_map:
+                        # 仅考虑不晚于 max_available_date 的日期，避免未来空值
+                        max_date_str = raw_data.get('max_available_date')
+                        # 单次遍历完成过滤与解析（date.fromisoformat 比 strptime 快得多）；
+                        # 有效日期随后会以完整数据写入，不在此重复插入
+                        stats_by_date = {}
+                        for d_str, d_stats in daily_map.items():
+                            if max_date_str and d_str > max_date_str:
+                                continue
+                            try:
+                                d_obj = date.fromisoformat(d_str)
+                            except ValueError:
+                                continue
+                            if d_obj != record_date:
+                                stats_by_date[d_obj] = d_stats
+                        # 一次查询出已存在的日期，已存在的记录跳过，其余一次性批量插入；
+                        # 只取 date 并去掉默认排序，查询可直接由 (app, date) 唯一索引完成
+                        existing_dates = set(
+                            DataRecord.objects.filter(app=app, date__in=stats_by_date)
+                            .order_by().values_list('date', flat=True)
                         )
-                        created_count += 1
-                    if created_count:
-                        self.stdout.write(f'  💾 已补齐Android缺口记录 {created_count} 天')
-                # 仍然确保写入本次“有效日期”的匀质记录（若未被补齐循环覆盖）
-                eff_str = raw_data.get('effective_date')
-                record_date = target_date.date()
-                if eff_str:
-                    try:
-                        record_date = datetime.strptime(eff_str, '%Y-%m-%d').date()
-                    except Exception:
-                        record_date = target_date.date()
-                DataRecord.objects.update_or_create(
-                    app=app,
-                    date=record_date,
-                    defaults={
+                        blob_name = (raw_data.get('raw_response') or {}).get('blob_name')
+                        backfill_records = [
+                            DataRecord(
+                                app=app,
+                                date=d_obj,
+                                downloads=int(d_stats.get('downloads', 0)),
+                                sessions=0,
+                                deletions=int(d_stats.get('deletions', 0)),
+                                unique_devices=None,
+                                revenue=0,
+                                rating=None,
+                                raw_data={'source': 'gplay_overview', 'note': 'backfill from overview', 'blob_name': blob_name}
+                            )
+                            for d_obj, d_stats in sorted(stats_by_date.items())
+                            if d_obj not in existing_dates
+                        ]
+                        if backfill_records:
+                            DataRecord.objects.bulk_create(backfill_records, ignore_conflicts=True)
+                        created_count = len(backfill_records)
+                        if created_count:
+                            out.write(f'  💾 已补齐Android缺口记录 {created_count} 天')
+                    # 写入（或覆盖）本次“有效日期”的记录
+                    self.upsert_data_record(app, record_date, {
                         'downloads': raw_data.get('downloads', 0),
                         'sessions': raw_data.get('sessions', 0),
                         'deletions': raw_data.get('deletions', 0),
                         'unique_devices': raw_data.get('unique_devices'),
                         'revenue': raw_data.get('revenue', 0),
                         'rating': raw_data.get('rating'),
-                        'raw_data': raw_data
-                    }
-                )
-                self.stdout.write(f'  💾 已更新Android记录（记录日期: {record_date}）')
-            else:
-                # iOS 原有逻辑
-                _, created = DataRecord.objects.update_or_create(
-                    app=app,
-                    date=target_date.date(),
-                    defaults={
-                        'downloads': raw_data.get('downloads', 0),
-                        'sessions': raw_data.get('sessions', 0),
-                        'deletions': raw_data.get('deletions', 0),
-                        'unique_devices': raw_data.get('unique_devices'),
+                        'raw_data': _slim_raw_data(raw_data)
+                    })
+                    out.write(f'  💾 已更新Android记录（记录日期: {record_date}）')
+                else:
+                    # iOS 原有逻辑
+                    self.upsert_data_record(app, target_date.date(), {
+                        **current_data,
                         'revenue': raw_data.get('revenue', 0),
                         'rating': raw_data.get('rating'),
-                        # 下载来源细分数据
-                        'downloads_app_store_search': raw_data.get('downloads_app_store_search', 0),
-                        'downloads_web_referrer': raw_data.get('downloads_web_referrer', 0),
-                        'downloads_app_referrer': raw_data.get('downloads_app_referrer', 0),
-                        'downloads_app_store_browse': raw_data.get('downloads_app_store_browse', 0),
-                        'downloads_institutional': raw_data.get('downloads_institutional', 0),
-                        'downloads_other': raw_data.get('downloads_other', 0),
-                        'raw_data': raw_data
-                    }
-                )
-                action = "创建" if created else "更新"
-                self.stdout.write(f'  💾 已{action}数据记录')
-        
-        # 5. 数据分析
-        # 确定用于分析/展示的日期：iOS 用 target_date；Android 用 effective_date（若有）
-        data_date_for_analysis = target_date
-        if app.platform == 'android':
-            eff_str = raw_data.get('effective_date')
-            if eff_str:
-                try:
-                    data_date_for_analysis = datetime.strptime(eff_str, '%Y-%m-%d')
-                except Exception:
-                    data_date_for_analysis = target_date
+                        'raw_data': _slim_raw_data(raw_data)
+                    })
+                    out.write(f'  💾 已保存数据记录')
 
-        current_data = {
-            'downloads': raw_data.get('downloads', 0),
-            'sessions': raw_data.get('sessions', 0),
-            'deletions': raw_data.get('deletions', 0),
-            'unique_devices': raw_data.get('unique_devices'),
-            # 下载来源细分数据
-            'downloads_app_store_search': raw_data.get('downloads_app_store_search', 0),
-            'downloads_web_referrer': raw_data.get('downloads_web_referrer', 0),
-            'downloads_app_referrer': raw_data.get('downloads_app_referrer', 0),
-            'downloads_app_store_browse': raw_data.get('downloads_app_store_browse', 0),
-            'downloads_institutional': raw_data.get('downloads_institutional', 0),
-            'downloads_other': raw_data.get('downloads_other', 0)
-        }
-        
+        # 5. 数据分析
         growth_rates = self.analyzer.calculate_growth_rates(
             current_data, app.id, data_date_for_analysis
         )
@@ -268,65 +379,96 @@ class Command(BaseCommand):
             app.id, current_data, growth_rates
         )
         
-        self.stdout.write(f'  🔍 完成数据分析 - DOD下载增长: {growth_rates.get("downloads_dod", 0):.1f}%')
+        out.write(f'  🔍 完成数据分析 - DOD下载增长: {growth_rates.get("downloads_dod", 0):.1f}%')
         
         # 6. 异常检测
         anomalies = self.detector.detect_anomalies(app.id, current_data, growth_rates)
+        alert_logs = []
+        if anomalies and not self.dry_run:
+            alert_logs = self.detector.log_anomalies(anomalies)
+        
+        send_notifications = not self.skip_notifications and not self.dry_run
         
+        # 告警与日报的Webhook推送提交到通知线程池并发发送，全部提交后再统一收集结果
+        alert_futures = []
         if anomalies:
-            self.stdout.write(f'  ⚠️ 检测到 {len(anomalies)} 个异常')
-            for anomaly in anomalies:
-                if not self.dry_run:
-                    alert_log = self.detector.log_anomaly(anomaly)
-                    self.stats['alerts_generated'] += 1
-                
-                # 发送告警通知
-                if not self.skip_notifications and not self.dry_run:
+            out.write(f'  ⚠️ 检测到 {len(anomalies)} 个异常')
+            if alert_logs:
+                self.increment_stat('alerts_generated', len(alert_logs))
+            
+            # 发送告警通知（dry-run 模式下 alert_logs 为空，不会发送）
+            if send_notifications:
+                for anomaly, alert_log in zip(anomalies, alert_logs):
                     webhook_url = anomaly.get('webhook_url')
                     if webhook_url:
-                        success = self.notifier.send_alert(webhook_url, anomaly)
-                        if success:
-                            self.stats['notifications_sent'] += 1
-                            if not self.dry_run:
-                                alert_log.is_sent = True
-                                alert_log.sent_at = timezone.now()
-                                alert_log.save()
-                        self.stdout.write(f'    📢 告警通知: {"✅ 成功" if success else "❌ 失败"}')
+                        future = self._notify_pool.submit(self.notifier.send_alert, webhook_url, anomaly)
+                        alert_futures.append((alert_log, future))
         else:
-            self.stdout.write(f'  ✅ 未检测到异常')
+            out.write(f'  ✅ 未检测到异常')
         
         # 7. 发送日报
-        if not self.skip_notifications and not self.dry_run:
-            try:
-                report_config = DailyReportConfig.objects.get(app=app, is_active=True)
-                
-                report_data = self.analyzer.format_report_data(
-                    app.name, current_data, growth_rates, insights, data_date_for_analysis
-                )
-                report_data['metric_availability'] = metric_availability
-                
-                success = self.notifier.send_daily_report(
-                    report_config.lark_webhook_daily, 
-                    report_data
-                )
-                
-                if success:
-                    self.stats['notifications_sent'] += 1
-                
-                self.stdout.write(f'  📋 日报发送: {"✅ 成功" if success else "❌ 失败"}')
-                
-            except DailyReportConfig.DoesNotExist:
-                self.stdout.write(f'  ⏭️ 跳过日报 - 未配置日报设置')
-            except Exception as e:
-                self.stdout.write(f'  ❌ 日报发送失败: {str(e)}')
+        report_config = None
+        report_future = None
+        report_error = None
+        if send_notifications:
+            report_config = self.report_cfg_by_app.get(app.id)
+            if report_config is not None:
+                try:
+                    report_data = self.analyzer.format_report_data(
+                        app.name, current_data, growth_rates, insights, data_date_for_analysis
+                    )
+                    report_data['metric_availability'] = metric_availability
+                    
+                    report_future = self._notify_pool.submit(
+                        self.notifier.send_daily_report,
+                        report_config.lark_webhook_daily, 
+                        report_data
+                    )
+                except Exception as e:
+                    report_error = e
+        
+        # 发送成功的告警记录在全部推送完成后以一条 UPDATE 统一标记
+        sent_alert_ids = []
+        for alert_log, future in alert_futures:
+            success = future.result()
+            if success:
+                self.increment_stat('notifications_sent')
+                sent_alert_ids.append(alert_log.id)
+            out.write(f'    📢 告警通知: {"✅ 成功" if success else "❌ 失败"}')
+        if sent_alert_ids:
+            AlertLog.objects.filter(id__in=sent_alert_ids).update(is_sent=True, sent_at=timezone.now())
+        
+        if send_notifications:
+            if report_config is None:
+                out.write(f'  ⏭️ 跳过日报 - 未配置日报设置')
+            elif report_error is not None:
+                out.write(f'  ❌ 日报发送失败: {str(report_error)}')
+            else:
+                try:
+                    success = report_future.result()
+                    
+                    if success:
+                        self.increment_stat('notifications_sent')
+                    
+                    out.write(f'  📋 日报发送: {"✅ 成功" if success else "❌ 失败"}')
+                    
+                except Exception as e:
+                    out.write(f'  ❌ 日报发送失败: {str(e)}')
+
+    def upsert_data_record(self, app: App, record_date, values: dict):
+        """以单条 INSERT ... ON CONFLICT 语句写入数据记录，已存在时只覆盖 values 中的字段"""
+        DataRecord.objects.bulk_create(
+            [DataRecord(app=app, date=record_date, **values)],
+            update_conflicts=True,
+            unique_fields=['app', 'date'],
+            update_fields=list(values),
+        )
 
     def send_error_notification(self, app: App, error_message: str):
         """发送错误通知"""
         try:
             # 尝试获取该App的日报配置来发送错误通知
-            report_config = DailyReportConfig.objects.filter(
-                app=app, is_active=True
-            ).first()
+            report_config = self.report_cfg_by_app.get(app.id)
             
             if report_config and report_config.lark_webhook_daily:
                 title = f"{app.name} 数据采集失败"
@@ -343,28 +485,29 @@ class Command(BaseCommand):
             self.stderr.write(f'发送错误通知失败: {str(e)}')
 
     def print_summary(self):
-        """打印汇总信息"""
-        self.stdout.write('\n' + '='*50)
-        self.stdout.write(self.style.SUCCESS('📊 任务执行汇总'))
-        self.stdout.write('='*50)
-        
-        self.stdout.write(f'总计App数量: {self.stats["total_apps"]}')
-        self.stdout.write(f'成功处理: {self.stats["success_count"]}')
-        self.stdout.write(f'失败数量: {self.stats["error_count"]}')
-        self.stdout.write(f'生成告警: {self.stats["alerts_generated"]}')
-        self.stdout.write(f'发送通知: {self.stats["notifications_sent"]}')
+        """打印汇总信息（先拼接完整文本，再一次性写出）"""
+        lines = [
+            '\n' + '='*50,
+            self.style.SUCCESS('📊 任务执行汇总'),
+            '='*50,
+            f'总计App数量: {self.stats["total_apps"]}',
+            f'成功处理: {self.stats["success_count"]}',
+            f'失败数量: {self.stats["error_count"]}',
+            f'生成告警: {self.stats["alerts_generated"]}',
+            f'发送通知: {self.stats["notifications_sent"]}',
+        ]
         
         if self.stats['errors']:
-            self.stdout.write('\n❌ 错误详情:')
-            for i, error in enumerate(self.stats['errors'], 1):
-                self.stdout.write(f'  {i}. {error}')
+            lines.append('\n❌ 错误详情:')
+            lines.extend(f'  {i}. {error}' for i, error in enumerate(self.stats['errors'], 1))
         
         # 根据结果显示不同颜色的状态
         if self.stats['error_count'] == 0:
-            self.stdout.write(self.style.SUCCESS('\n🎉 所有任务执行成功！'))
+            lines.append(self.style.SUCCESS('\n🎉 所有任务执行成功！'))
         elif self.stats['success_count'] > 0:
-            self.stdout.write(self.style.WARNING('\n⚠️ 部分任务执行成功'))
+            lines.append(self.style.WARNING('\n⚠️ 部分任务执行成功'))
         else:
-            self.stdout.write(self.style.ERROR('\n💥 所有任务执行失败！'))
+            lines.append(self.style.ERROR('\n💥 所有任务执行失败！'))
         
-        self.stdout.write('='*50)
\ No newline at end of file
+        lines.append('='*50)
+        self.stdout.write('\n'.join(lines))
@@ -1,7 +1,6 @@
 from django.core.management.base import BaseCommand
 from datetime import datetime, timedelta
 from ...models import App, Credential
-from ...utils.api_clients import APIClientFactory
 
 
 class Command(BaseCommand):
@@ -51,7 +50,10 @@ class Command(BaseCommand):
 
     def test_app_api(self, app: App):
         """测试单个App的API"""
-        self.stdout.write(f'\n📱 测试App: {app.name} ({app.get_platform_display()})')
+        from ...utils.api_clients import APIClientFactory
+        
+        platform_display = app.get_platform_display()
+        self.stdout.write(f'\n📱 测试App: {app.name} ({platform_display})')
         
         try:
             # 获取凭证
@@ -131,7 +133,7 @@ class Command(BaseCommand):
                     self.stdout.write(f'    ❌ 统计数据获取失败: {str(e)}')
             
         except Credential.DoesNotExist:
-            self.stdout.write(f'  ❌ 未找到{app.get_platform_display()}平台的有效凭证')
+            self.stdout.write(f'  ❌ 未找到{platform_display}平台的有效凭证')
         except Exception as e:
             self.stdout.write(f'  ❌ 测试失败: {str(e)}')
 
@@ -1,8 +1,13 @@
 from django.core.management.base import BaseCommand
-from ...utils.lark_notifier import LarkNotifier
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from ...models import DailyReportConfig, AlertRule
 
 
+# 同时测试的Webhook数量上限
+MAX_CONCURRENT_TESTS = 16
+
+
 class Command(BaseCommand):
     help = '测试Lark Webhook连接'
 
@@ -24,6 +29,8 @@ class Command(BaseCommand):
         )
 
     def handle(self, *args, **options):
+        from ...utils.lark_notifier import LarkNotifier
+        
         notifier = LarkNotifier()
         
         if options.get('webhook_url'):
@@ -60,28 +67,28 @@ class Command(BaseCommand):
             daily_config = DailyReportConfig.objects.get(app_id=app_id, is_active=True)
             self.stdout.write(f'📋 测试日报Webhook')
             result = notifier.test_webhook(daily_config.lark_webhook_daily)
-            status = '✅ 成功' if result['success'] else f'❌ 失败: {result["message"]}'
+            status = self.format_result(result)
             self.stdout.write(f'   {status}')
         except DailyReportConfig.DoesNotExist:
             self.stdout.write('📋 未找到日报配置')
         
         # 测试告警Webhook
-        alert_rules = AlertRule.objects.filter(
+        alert_rules = list(AlertRule.objects.filter(
             app_id=app_id, 
             is_active=True,
             lark_webhook_alert__isnull=False
-        ).exclude(lark_webhook_alert='')
+        ).exclude(lark_webhook_alert='').only('lark_webhook_alert', 'metric'))
         
         if alert_rules:
-            self.stdout.write(f'⚠️ 测试告警Webhook ({alert_rules.count()}个)')
+            self.stdout.write(f'⚠️ 测试告警Webhook ({len(alert_rules)}个)')
             tested_webhooks = set()
             
             for rule in alert_rules:
                 webhook_url = rule.lark_webhook_alert
                 if webhook_url not in tested_webhooks:
                     result = notifier.test_webhook(webhook_url)
-                    status = '✅ 成功' if result['success'] else f'❌ 失败: {result["message"]}'
-                    self.stdout.write(f'   {rule.get_metric_display()}: {status}')
+                    status = self.format_result(result)
+                    self.stdout.write(f'   {AlertRule.METRIC_DISPLAY.get(rule.metric, rule.metric)}: {status}')
                     tested_webhooks.add(webhook_url)
         else:
             self.stdout.write('⚠️ 未找到告警配置')
@@ -90,48 +97,37 @@ class Command(BaseCommand):
         """测试所有Webhook配置"""
         self.stdout.write('🧪 测试所有配置的Webhook')
         
-        total_tested = 0
-        success_count = 0
-        
-        # 测试所有日报Webhook
-        daily_configs = DailyReportConfig.objects.filter(is_active=True)
-        self.stdout.write(f'\n📋 日报Webhook ({daily_configs.count()}个)')
-        
+        # 按URL归并日报配置与告警规则，同一个Webhook只测试一次
+        daily_configs = DailyReportConfig.objects.filter(is_active=True).select_related('app').only(
+            'lark_webhook_daily', 'app__name'
+        )
+        daily_by_url = defaultdict(list)
         for config in daily_configs:
-            total_tested += 1
-            result = notifier.test_webhook(config.lark_webhook_daily)
-            if result['success']:
-                success_count += 1
-                status = '✅ 成功'
-            else:
-                status = f'❌ 失败: {result["message"]}'
-            
-            self.stdout.write(f'   {config.app.name}: {status}')
+            daily_by_url[config.lark_webhook_daily].append(config.app.name)
         
-        # 测试所有告警Webhook
-        alert_webhooks = AlertRule.objects.filter(
+        alert_rules = AlertRule.objects.filter(
             is_active=True,
             lark_webhook_alert__isnull=False
-        ).exclude(lark_webhook_alert='').values_list('lark_webhook_alert', flat=True).distinct()
+        ).exclude(lark_webhook_alert='').select_related('app').only(
+            'lark_webhook_alert', 'metric', 'app__name'
+        )
+        alert_by_url = defaultdict(list)
+        for rule in alert_rules:
+            alert_by_url[rule.lark_webhook_alert].append(f'{rule.app.name}-{AlertRule.METRIC_DISPLAY.get(rule.metric, rule.metric)}')
         
-        self.stdout.write(f'\n⚠️ 告警Webhook ({len(alert_webhooks)}个)')
+        results = self.run_webhook_tests(notifier, set(daily_by_url) | set(alert_by_url))
+        total_tested = len(results)
+        success_count = sum(1 for result in results.values() if result['success'])
         
-        for webhook_url in alert_webhooks:
-            total_tested += 1
-            result = notifier.test_webhook(webhook_url)
-            if result['success']:
-                success_count += 1
-                status = '✅ 成功'
-            else:
-                status = f'❌ 失败: {result["message"]}'
-            
-            # 显示使用此Webhook的规则
-            rules = AlertRule.objects.filter(
-                lark_webhook_alert=webhook_url, is_active=True
-            )
-            rules_text = ', '.join([f'{rule.app.name}-{rule.get_metric_display()}' for rule in rules])
-            
-            self.stdout.write(f'   {rules_text}: {status}')
+        # 日报Webhook
+        self.stdout.write(f'\n📋 日报Webhook ({len(daily_by_url)}个)')
+        for webhook_url, app_names in daily_by_url.items():
+            self.stdout.write(f'   {", ".join(app_names)}: {self.format_result(results[webhook_url])}')
+        
+        # 告警Webhook
+        self.stdout.write(f'\n⚠️ 告警Webhook ({len(alert_by_url)}个)')
+        for webhook_url, rule_names in alert_by_url.items():
+            self.stdout.write(f'   {", ".join(rule_names)}: {self.format_result(results[webhook_url])}')
         
         # 汇总
         self.stdout.write('\n' + '='*50)
@@ -142,4 +138,16 @@ class Command(BaseCommand):
         elif success_count > 0:
             self.stdout.write(self.style.WARNING('⚠️ 部分Webhook测试失败'))
         else:
-            self.stdout.write(self.style.ERROR('💥 所有Webhook测试失败！'))
\ No newline at end of file
+            self.stdout.write(self.style.ERROR('💥 所有Webhook测试失败！'))
+
+    def run_webhook_tests(self, notifier, webhook_urls):
+        """并发测试多个Webhook URL，返回 {url: 测试结果}"""
+        webhook_urls = list(webhook_urls)
+        if not webhook_urls:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(len(webhook_urls), MAX_CONCURRENT_TESTS)) as pool:
+            return dict(zip(webhook_urls, pool.map(notifier.test_webhook, webhook_urls)))
+
+    def format_result(self, result):
+        """格式化单个Webhook的测试结果"""
+        return '✅ 成功' if result['success'] else f'❌ 失败: {result["message"]}'
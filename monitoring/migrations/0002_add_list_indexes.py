@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-16 06:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='alertlog',
+            index=models.Index(fields=['-created_at'], name='alertlog_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='datarecord',
+            index=models.Index(fields=['-date', 'app'], name='datarecord_date_app_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='taskexecution',
+            index=models.Index(fields=['-created_at'], name='taskexec_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='taskexecution',
+            index=models.Index(fields=['schedule', '-created_at'], name='taskexec_schedule_created_idx'),
+        ),
+    ]
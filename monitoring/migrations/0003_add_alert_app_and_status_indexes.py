@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-16 06:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0002_add_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='alertlog',
+            index=models.Index(fields=['app', '-created_at'], name='alertlog_app_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='taskexecution',
+            index=models.Index(fields=['status', '-created_at'], name='taskexec_status_created_idx'),
+        ),
+    ]
@@ -1,8 +1,10 @@
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
+from django.utils.functional import cached_property
+from django.utils.text import slugify
 from .utils.encryption import encrypt_data, decrypt_data
-import json
+import orjson
 
 
 class App(models.Model):
@@ -10,6 +12,8 @@ class App(models.Model):
         ('ios', 'iOS'),
         ('android', 'Android'),
     ]
+    # 显示名称查找表：get_FOO_display() 每次调用都会重建 choices 字典，__str__ 等高频路径直接查表
+    PLATFORM_DISPLAY = dict(PLATFORM_CHOICES)
     
     name = models.CharField(max_length=200, verbose_name='App名称')
     platform = models.CharField(
@@ -32,7 +36,12 @@ class App(models.Model):
         ordering = ['name']
     
     def __str__(self):
-        return f"{self.name} ({self.get_platform_display()})"
+        return f"{self.name} ({self.PLATFORM_DISPLAY.get(self.platform, self.platform)})"
+    
+    @cached_property
+    def slug(self):
+        """用于导出文件名的App标识"""
+        return slugify(self.name)
 
 
 class Credential(models.Model):
@@ -40,6 +49,7 @@ class Credential(models.Model):
         ('ios', 'Apple App Store Connect'),
         ('android', 'Google Play Console'),
     ]
+    PLATFORM_DISPLAY = dict(PLATFORM_CHOICES)
     
     platform = models.CharField(
         max_length=10, 
@@ -58,20 +68,25 @@ class Credential(models.Model):
     
     def set_config_data(self, data):
         """加密存储配置数据"""
-        json_data = json.dumps(data)
+        json_data = orjson.dumps(data).decode()
         self._config_data = encrypt_data(json_data)
+        self._config_cache = (self._config_data, data)
     
     def get_config_data(self):
-        """解密获取配置数据"""
-        if self._config_data:
+        """解密获取配置数据（按密文缓存在实例上，避免重复解密）"""
+        if not self._config_data:
+            return {}
+        cache = getattr(self, '_config_cache', None)
+        if cache is None or cache[0] != self._config_data:
             decrypted_data = decrypt_data(self._config_data)
-            return json.loads(decrypted_data)
-        return {}
+            cache = (self._config_data, orjson.loads(decrypted_data))
+            self._config_cache = cache
+        return cache[1]
     
     config_data = property(get_config_data, set_config_data)
     
     def __str__(self):
-        return f"{self.get_platform_display()} 凭证"
+        return f"{self.PLATFORM_DISPLAY.get(self.platform, self.platform)} 凭证"
 
 
 class AlertRule(models.Model):
@@ -81,12 +96,14 @@ class AlertRule(models.Model):
         ('deletions', '卸载量'),
         ('unique_devices', '活跃独立设备数'),
     ]
+    METRIC_DISPLAY = dict(METRIC_CHOICES)
     
     COMPARISON_CHOICES = [
         ('dod', '日环比 (DOD)'),
         ('wow', '周同比 (WOW)'),
         ('absolute', '绝对值'),
     ]
+    COMPARISON_DISPLAY = dict(COMPARISON_CHOICES)
     
     app = models.ForeignKey(App, on_delete=models.CASCADE, verbose_name='App')
     metric = models.CharField(
@@ -129,7 +146,7 @@ class AlertRule(models.Model):
         unique_together = ['app', 'metric', 'comparison_type']
     
     def __str__(self):
-        return f"{self.app.name} - {self.get_metric_display()} ({self.get_comparison_type_display()})"
+        return f"{self.app.name} - {self.METRIC_DISPLAY.get(self.metric, self.metric)} ({self.COMPARISON_DISPLAY.get(self.comparison_type, self.comparison_type)})"
 
 
 class DailyReportConfig(models.Model):
@@ -242,6 +259,9 @@ class DataRecord(models.Model):
         verbose_name_plural = '数据记录'
         unique_together = ['app', 'date']
         ordering = ['-date', 'app']
+        indexes = [
+            models.Index(fields=['-date', 'app'], name='datarecord_date_app_idx'),
+        ]
     
     def __str__(self):
         return f"{self.app.name} - {self.date}"
@@ -252,6 +272,7 @@ class AlertLog(models.Model):
         ('threshold', '阈值告警'),
         ('error', '错误告警'),
     ]
+    ALERT_TYPE_DISPLAY = dict(ALERT_TYPES)
     
     app = models.ForeignKey(
         App, 
@@ -289,10 +310,14 @@ class AlertLog(models.Model):
         verbose_name = '告警日志'
         verbose_name_plural = '告警日志'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='alertlog_created_idx'),
+            models.Index(fields=['app', '-created_at'], name='alertlog_app_created_idx'),
+        ]
     
     def __str__(self):
         app_name = self.app.name if self.app else "系统"
-        return f"{app_name} - {self.get_alert_type_display()} - {self.created_at.strftime('%Y-%m-%d %H:%M')}"
+        return f"{app_name} - {self.ALERT_TYPE_DISPLAY.get(self.alert_type, self.alert_type)} - {self.created_at.strftime('%Y-%m-%d %H:%M')}"
 
 
 class TaskSchedule(models.Model):
@@ -301,6 +326,7 @@ class TaskSchedule(models.Model):
         ('weekly', '每周'),
         ('monthly', '每月'),
     ]
+    FREQUENCY_DISPLAY = dict(FREQUENCY_CHOICES)
     
     TASK_TYPE_CHOICES = [
         ('data_collection', '数据采集'),
@@ -367,7 +393,7 @@ class TaskSchedule(models.Model):
     
     def __str__(self):
         app_name = self.app.name if self.app else "所有App"
-        return f"{self.name} - {app_name} ({self.get_frequency_display()} {self.hour:02d}:{self.minute:02d})"
+        return f"{self.name} - {app_name} ({self.FREQUENCY_DISPLAY.get(self.frequency, self.frequency)} {self.hour:02d}:{self.minute:02d})"
     
     def get_cron_expression(self):
         """获取cron表达式"""
@@ -382,6 +408,16 @@ class TaskSchedule(models.Model):
         return None
 
 
+class TaskExecutionQuerySet(models.QuerySet):
+    def retryable(self):
+        """可重试的执行记录，条件与 TaskExecution.can_retry() 一致，在数据库侧筛选"""
+        return self.filter(
+            schedule__isnull=False,
+            status__in=['failed', 'timeout'],
+            retry_count__lt=models.F('schedule__retry_count')
+        ).select_related('schedule', 'app')
+
+
 class TaskExecution(models.Model):
     STATUS_CHOICES = [
         ('pending', '等待中'),
@@ -391,6 +427,16 @@ class TaskExecution(models.Model):
         ('timeout', '超时'),
         ('cancelled', '已取消'),
     ]
+    STATUS_DISPLAY = dict(STATUS_CHOICES)
+    # 执行状态对应的显示图标（命令行输出使用）
+    STATUS_EMOJI = {
+        'success': '✅',
+        'failed': '❌',
+        'running': '🔄',
+        'pending': '⏳',
+        'timeout': '⏰',
+        'cancelled': '🚫',
+    }
     
     TRIGGER_CHOICES = [
         ('scheduled', '定时触发'),
@@ -441,15 +487,30 @@ class TaskExecution(models.Model):
     retry_count = models.IntegerField(default=0, verbose_name='已重试次数')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
     
+    objects = TaskExecutionQuerySet.as_manager()
+    
     class Meta:
         verbose_name = '任务执行记录'
         verbose_name_plural = '任务执行记录'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='taskexec_created_idx'),
+            models.Index(fields=['schedule', '-created_at'], name='taskexec_schedule_created_idx'),
+            models.Index(fields=['status', '-created_at'], name='taskexec_status_created_idx'),
+        ]
     
     def __str__(self):
         schedule_name = self.schedule.name if self.schedule else "手动任务"
         app_name = self.app.name if self.app else "所有App"
-        return f"{schedule_name} - {app_name} ({self.get_status_display()}) - {self.created_at.strftime('%Y-%m-%d %H:%M')}"
+        return f"{schedule_name} - {app_name} ({self.STATUS_DISPLAY.get(self.status, self.status)}) - {self.created_at.strftime('%Y-%m-%d %H:%M')}"
+    
+    @staticmethod
+    def format_duration(seconds):
+        """将秒数格式化为“X秒”或“X分Y秒”"""
+        if seconds < 60:
+            return f'{seconds}秒'
+        minutes, seconds = divmod(seconds, 60)
+        return f'{minutes}分{seconds}秒'
     
     def mark_started(self):
         """标记任务开始"""
@@ -1,12 +1,18 @@
 import pandas as pd
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Tuple
-from django.db.models import QuerySet
+from typing import Dict, Iterable, List, Optional, Any, Tuple
 from ..models import DataRecord
 import logging
 
 logger = logging.getLogger(__name__)
 
+# 同比/环比计算用到的历史指标字段
+_HISTORY_FIELDS = (
+    'downloads', 'sessions', 'deletions', 'unique_devices',
+    'downloads_app_store_search', 'downloads_web_referrer', 'downloads_app_referrer',
+    'downloads_app_store_browse', 'downloads_institutional', 'downloads_other',
+)
+
 
 class DataAnalyzer:
     """数据分析引擎"""
@@ -127,37 +133,19 @@ class DataAnalyzer:
             yesterday_date = (current_date - timedelta(days=1)).date()
             last_week_date = (current_date - timedelta(days=7)).date()
 
-            # Fetch both records in a single query
+            # Fetch both records in a single query as plain dicts of the metric columns;
+            # no model instances are built and raw_data is never loaded
             records = DataRecord.objects.filter(
                 app_id=app_id,
                 date__in=[yesterday_date, last_week_date]
-            )
+            ).values('date', *_HISTORY_FIELDS)
 
             # Create a dictionary for quick lookups
-            records_by_date = {record.date: record for record in records}
-
-            yesterday_record = records_by_date.get(yesterday_date)
-            last_week_record = records_by_date.get(last_week_date)
-
-            def record_to_dict(record: Optional[DataRecord]) -> Optional[Dict[str, Any]]:
-                if not record:
-                    return None
-                return {
-                    'downloads': record.downloads,
-                    'sessions': record.sessions,
-                    'deletions': record.deletions,
-                    'unique_devices': record.unique_devices,
-                    'downloads_app_store_search': record.downloads_app_store_search,
-                    'downloads_web_referrer': record.downloads_web_referrer,
-                    'downloads_app_referrer': record.downloads_app_referrer,
-                    'downloads_app_store_browse': record.downloads_app_store_browse,
-                    'downloads_institutional': record.downloads_institutional,
-                    'downloads_other': record.downloads_other,
-                }
+            records_by_date = {record.pop('date'): record for record in records}
 
             return {
-                'yesterday': record_to_dict(yesterday_record),
-                'last_week': record_to_dict(last_week_record)
+                'yesterday': records_by_date.get(yesterday_date),
+                'last_week': records_by_date.get(last_week_date)
             }
             
         except Exception as e:
@@ -172,7 +160,7 @@ class DataAnalyzer:
         change = ((new_value - old_value) / old_value) * 100
         return round(change, 2)
     
-    def analyze_trend(self, app_id: int, days: int = 30, metric: str = 'downloads', records_qs: Optional[QuerySet] = None) -> Dict[str, Any]:
+    def analyze_trend(self, app_id: int, days: int = 30, metric: str = 'downloads', records_qs: Optional[Iterable[Dict[str, Any]]] = None) -> Dict[str, Any]:
         """
         分析趋势
         
@@ -180,7 +168,8 @@ class DataAnalyzer:
             app_id: App ID
             days: 分析天数
             metric: 指标名称 ('downloads', 'sessions', 'deletions', 'unique_devices')
-            records_qs: Optional pre-fetched QuerySet of DataRecord objects.
+            records_qs: 预先查询好的记录，按日期升序，每条为包含 date 与该指标字段的字典
+                （如 QuerySet.values() 的结果），可在多个指标间复用
             
         Returns:
             趋势分析结果
@@ -190,25 +179,21 @@ class DataAnalyzer:
                 end_date = datetime.now().date()
                 start_date = end_date - timedelta(days=days)
 
-                # 获取历史数据
+                # 获取历史数据（只取日期和该指标两列）
                 records_qs = DataRecord.objects.filter(
                     app_id=app_id,
                     date__gte=start_date,
                     date__lte=end_date
-                ).order_by('date')
+                ).order_by('date').values('date', metric)
             
             if not records_qs:
                 return {'trend': 'insufficient_data', 'confidence': 0}
             
             # 转换为DataFrame进行分析
-            data = []
-            for record in records_qs:
-                data.append({
-                    'date': record.date,
-                    'value': getattr(record, metric, 0)
-                })
-            
-            df = pd.DataFrame(data)
+            df = pd.DataFrame(
+                [(record['date'], record[metric]) for record in records_qs],
+                columns=['date', 'value']
+            )
             
             if len(df) < 3:
                 return {'trend': 'insufficient_data', 'confidence': 0}
@@ -307,11 +292,11 @@ class DataAnalyzer:
             # Fetch trend data once for the last 7 days
             end_date = datetime.now().date()
             start_date = end_date - timedelta(days=7)
-            trend_records = DataRecord.objects.filter(
+            trend_records = list(DataRecord.objects.filter(
                 app_id=app_id,
                 date__gte=start_date,
                 date__lte=end_date
-            ).order_by('date')
+            ).order_by('date').values('date', 'downloads', 'deletions'))
             
             # 趋势洞察
             downloads_trend = self.analyze_trend(app_id, days=7, metric='downloads', records_qs=trend_records)
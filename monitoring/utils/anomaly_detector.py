@@ -29,13 +29,13 @@ class AnomalyDetector:
         anomalies = []
         
         try:
-            # 获取该App的所有活跃告警规则
-            alert_rules = AlertRule.objects.filter(
+            # 获取该App的所有活跃告警规则（一次查询取出，并带出告警消息需要的App名称）
+            alert_rules = list(AlertRule.objects.filter(
                 app_id=app_id,
                 is_active=True
-            )
+            ).select_related('app'))
             
-            self.logger.info(f"检测App {app_id}的异常，共有 {alert_rules.count()} 个活跃规则")
+            self.logger.info(f"检测App {app_id}的异常，共有 {len(alert_rules)} 个活跃规则")
             
             for rule in alert_rules:
                 anomaly = self._check_single_rule(rule, current_data, growth_rates)
@@ -72,7 +72,7 @@ class AnomalyDetector:
                 # 增长率比较
                 metric_key = f"{rule.metric}_{rule.comparison_type}"
                 current_value = growth_rates.get(metric_key, 0)
-                comparison_text = rule.get_comparison_type_display()
+                comparison_text = AlertRule.COMPARISON_DISPLAY.get(rule.comparison_type, rule.comparison_type)
             
             # 检查是否触发告警
             triggered = False
@@ -98,7 +98,7 @@ class AnomalyDetector:
                 'app_id': rule.app_id,
                 'app_name': rule.app.name,
                 'metric': rule.metric,
-                'metric_display': rule.get_metric_display(),
+                'metric_display': AlertRule.METRIC_DISPLAY.get(rule.metric, rule.metric),
                 'comparison_type': rule.comparison_type,
                 'comparison_display': comparison_text,
                 'current_value': current_value,
@@ -122,7 +122,7 @@ class AnomalyDetector:
                                comparison_text: str) -> str:
         """生成告警消息"""
         app_name = rule.app.name
-        metric_display = rule.get_metric_display()
+        metric_display = AlertRule.METRIC_DISPLAY.get(rule.metric, rule.metric)
         
         if trigger_type == 'above_maximum':
             direction = "超过上限"
@@ -174,33 +174,43 @@ class AnomalyDetector:
         except Exception:
             return 'medium'  # 默认中等严重程度
     
-    def log_anomaly(self, anomaly: Dict[str, Any]) -> AlertLog:
+    def build_alert_log(self, anomaly: Dict[str, Any]) -> AlertLog:
         """
-        记录异常到数据库
+        根据异常信息构造AlertLog实例（不写入数据库）
         
         Args:
             anomaly: 异常信息
             
         Returns:
-            创建的AlertLog实例
+            未保存的AlertLog实例
         """
-        try:
-            from ..models import App
-            
-            app = App.objects.get(id=anomaly['app_id'])
+        return AlertLog(
+            app_id=anomaly['app_id'],
+            alert_type='threshold',
+            metric=anomaly['metric'],
+            message=anomaly['message'],
+            current_value=anomaly['current_value'],
+            threshold_value=anomaly['threshold_value'],
+            is_sent=False
+        )
+    
+    def log_anomalies(self, anomalies: List[Dict[str, Any]]) -> List[AlertLog]:
+        """
+        批量记录异常到数据库（单条 INSERT）
+        
+        Args:
+            anomalies: 异常信息列表
             
-            alert_log = AlertLog.objects.create(
-                app=app,
-                alert_type='threshold',
-                metric=anomaly['metric'],
-                message=anomaly['message'],
-                current_value=anomaly['current_value'],
-                threshold_value=anomaly['threshold_value'],
-                is_sent=False
+        Returns:
+            创建的AlertLog实例列表，顺序与 anomalies 一致
+        """
+        try:
+            alert_logs = AlertLog.objects.bulk_create(
+                [self.build_alert_log(anomaly) for anomaly in anomalies]
             )
             
-            self.logger.info(f"异常已记录到数据库: AlertLog ID {alert_log.id}")
-            return alert_log
+            self.logger.info(f"异常已记录到数据库: {len(alert_logs)} 条AlertLog")
+            return alert_logs
             
         except Exception as e:
             self.logger.error(f"记录异常失败: {e}")
@@ -1,6 +1,7 @@
 from re import I
 import requests
 import jwt
+import orjson
 import time
 from datetime import datetime, timedelta
 from typing import Dict, Optional, Any, List
@@ -1460,8 +1461,7 @@ class APIClientFactory:
     @staticmethod
     def create_google_client(config_data: Dict[str, Any]) -> GooglePlayConsoleClient:
         """创建Google客户端"""
-        import json
-        service_account_info = json.loads(config_data['service_account_key'])
+        service_account_info = orjson.loads(config_data['service_account_key'])
         # 可选从配置中获取 GCS bucket 与 project
         bucket_name = config_data.get('gcs_bucket_name') or config_data.get('bucket_name')
         project_id = config_data.get('gcs_project_id') or config_data.get('project_id')
@@ -1,11 +1,18 @@
 from cryptography.fernet import Fernet, InvalidToken
 from django.conf import settings
+from functools import lru_cache
 import base64
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=4)
+def _get_fernet(key: bytes) -> Fernet:
+    """按密钥缓存 Fernet 实例，避免每次加解密都重新解析密钥"""
+    return Fernet(key)
+
+
 def get_encryption_key():
     """获取并验证加密密钥"""
     key_str = getattr(settings, 'ENCRYPTION_KEY', None)
@@ -19,7 +26,7 @@ def get_encryption_key():
         key = key_str.encode()
         # The key must be a URL-safe base64-encoded 32-byte key.
         # Fernet's constructor will validate this.
-        Fernet(key)
+        _get_fernet(key)
         return key
     except Exception as e:
         logger.error(f"Invalid ENCRYPTION_KEY: {e}")
@@ -34,8 +41,7 @@ def encrypt_data(data: str) -> str:
         return ""
     
     try:
-        key = get_encryption_key()
-        f = Fernet(key)
+        f = _get_fernet(get_encryption_key())
         encrypted_token = f.encrypt(data.encode())
         # Fernet token is already bytes, just decode for storing in a text field.
         return encrypted_token.decode()
@@ -52,21 +58,28 @@ def decrypt_data(encrypted_data: str) -> str:
         return ""
     
     try:
-        key = get_encryption_key()
-        f = Fernet(key)
-
-        # First, try to decrypt assuming the new, direct format.
-        try:
-            return f.decrypt(encrypted_data.encode()).decode()
-        except InvalidToken:
-            # If that fails, it might be the old, double-encoded format.
-            logger.debug("Direct decryption failed, trying legacy format (double base64).")
-            decoded_data = base64.b64decode(encrypted_data.encode())
-            return f.decrypt(decoded_data).decode()
-
+        return _decrypt_cached(get_encryption_key(), encrypted_data)
     except Exception as e:
         logger.error(f"Failed to decrypt data: {e}")
         # Add more context to the error.
         raise ValueError(
             f"Decryption failed. The credential may be corrupted or the ENCRYPTION_KEY may have changed. Error: {e}"
-        )
\ No newline at end of file
+        )
+
+
+@lru_cache(maxsize=128)
+def _decrypt_cached(key: bytes, encrypted_data: str) -> str:
+    """
+    按 (密钥, 密文) 缓存解密结果：同一密文每次解密结果相同，
+    凭证更新后密文随之变化，不需要额外失效处理。解密失败不会被缓存。
+    """
+    f = _get_fernet(key)
+
+    # First, try to decrypt assuming the new, direct format.
+    try:
+        return f.decrypt(encrypted_data.encode()).decode()
+    except InvalidToken:
+        # If that fails, it might be the old, double-encoded format.
+        logger.debug("Direct decryption failed, trying legacy format (double base64).")
+        decoded_data = base64.b64decode(encrypted_data.encode())
+        return f.decrypt(decoded_data).decode()
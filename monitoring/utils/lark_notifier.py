@@ -1,12 +1,18 @@
 import requests
+from requests.adapters import HTTPAdapter
 import json
 from typing import Dict, List, Any, Optional
 from datetime import datetime
+from django.conf import settings
 from django.utils import timezone
 import logging
 
 logger = logging.getLogger(__name__)
 
+# 连接池大小下限；实际大小取它与通知线程池并发数（DAILY_TASK_CONCURRENCY）中的较大者，
+# 否则并发推送时多余的连接用完即弃，无法复用
+HTTP_POOL_MIN_SIZE = 32
+
 
 class LarkNotifier:
     """Lark (飞书) 通知器"""
@@ -14,6 +20,12 @@ class LarkNotifier:
     def __init__(self):
         self.logger = logging.getLogger(f"{__name__}.{self.__class__.__name__}")
         self.timeout = 30
+        # 复用同一个Session，对同一Webhook域名的多次推送可以复用TCP/TLS连接
+        self.session = requests.Session()
+        pool_size = max(HTTP_POOL_MIN_SIZE, settings.DAILY_TASK_CONCURRENCY)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
     
     def send_daily_report(self, webhook_url: str, report_data: Dict[str, Any]) -> bool:
         """
@@ -503,7 +515,7 @@ class LarkNotifier:
                 'Content-Type': 'application/json'
             }
             
-            response = requests.post(
+            response = self.session.post(
                 webhook_url,
                 headers=headers,
                 json=message_data,
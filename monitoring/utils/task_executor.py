@@ -1,10 +1,12 @@
 import logging
+import os
 import traceback
 from datetime import datetime, timedelta
 from io import StringIO
 import sys
 import threading
 import signal
+from django.conf import settings
 from django.utils import timezone
 from django.core.management import call_command
 from django.core.management.base import CommandError
@@ -19,6 +21,8 @@ class TaskExecutor:
     
     def __init__(self):
         self.current_execution = None
+        # 最近一次执行创建的记录（已包含执行结果），调用方可直接使用而无需再次查询
+        self.last_execution = None
         self.should_stop = False
         
     def execute_schedule_auto(self, schedule: TaskSchedule, target_date=None):
@@ -56,6 +60,7 @@ class TaskExecutor:
     
     def retry_execution(self, execution: TaskExecution):
         """重试失败的执行"""
+        self.last_execution = None
         if not execution.can_retry():
             logger.warning(f"执行 {execution.id} 不能重试")
             return False
@@ -83,6 +88,7 @@ class TaskExecutor:
     
     def _execute_schedule(self, schedule: TaskSchedule, trigger_type='scheduled', target_date=None):
         """执行调度任务的内部方法"""
+        self.last_execution = None
         if not schedule.is_active:
             logger.info(f"跳过已禁用的任务调度: {schedule.name}")
             return False
@@ -121,6 +127,7 @@ class TaskExecutor:
                       skip_notifications=False, timeout_minutes=30):
         """执行任务的核心方法"""
         self.current_execution = execution
+        self.last_execution = execution
         self.should_stop = False
         
         # 标记开始执行
@@ -131,7 +138,8 @@ class TaskExecutor:
         cmd_args = []
         cmd_options = {
             'skip_notifications': skip_notifications,
-            'verbosity': 1,
+            # verbosity=2 让命令在App处理失败时输出完整 traceback，保存到执行记录的错误日志中
+            'verbosity': 2,
         }
         
         if app_id:
@@ -312,8 +320,52 @@ class TaskScheduler:
         self.running = False
         if self.scheduler_thread:
             self.scheduler_thread.join(timeout=5)
+        self._remove_pid_file()
         logger.info("任务调度器已停止")
     
+    @staticmethod
+    def is_running():
+        """根据PID文件判断调度器进程是否在运行（可在调度器进程之外调用）"""
+        try:
+            with open(settings.SCHEDULER_PID_FILE) as f:
+                pid = int(f.read().strip())
+        except (OSError, ValueError):
+            return False
+        
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            # 进程存在但属于其他用户
+            return True
+        return True
+    
+    def write_pid_file(self):
+        """记录当前进程PID，供其他进程查询调度器状态；仅由常驻的守护进程调用
+        
+        已有其他存活的调度器进程时不覆盖其PID，返回 False
+        """
+        if self.is_running():
+            logger.warning("已有调度器进程在运行，不覆盖PID文件")
+            return False
+        try:
+            with open(settings.SCHEDULER_PID_FILE, 'w') as f:
+                f.write(str(os.getpid()))
+        except OSError as e:
+            logger.warning(f"写入调度器PID文件失败: {e}")
+        return True
+    
+    def _remove_pid_file(self):
+        """删除PID文件（仅当文件记录的是当前进程时）"""
+        try:
+            with open(settings.SCHEDULER_PID_FILE) as f:
+                if f.read().strip() != str(os.getpid()):
+                    return
+            os.remove(settings.SCHEDULER_PID_FILE)
+        except OSError:
+            pass
+    
     def _scheduler_loop(self):
         """调度器主循环"""
         while self.running: